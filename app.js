@@ -1,6 +1,59 @@
 const API = "";
 let currentUser = null;
 
+// Society (tenant) scope: the logged-in user's society, else ?society= from the page URL
+function currentSocietyId() {
+  return (currentUser && currentUser.society_id) || new URLSearchParams(window.location.search).get('society') || '';
+}
+
+// Attach the society scope to every API call
+const nativeFetch = window.fetch.bind(window);
+window.fetch = (url, options = {}) => {
+  // Any write makes the dashboard bootstrap payload stale
+  if (options.method && options.method.toUpperCase() !== 'GET') dashboardBootstrap = null;
+  const societyId = currentSocietyId();
+  if (!societyId) return nativeFetch(url, options);
+  const headers = new Headers(options.headers || {});
+  headers.set('X-Society-ID', societyId);
+  return nativeFetch(url, { ...options, headers });
+};
+
+// Compact list responses send keys once: { columns: [...], rows: [[...], ...] }
+function decodeCompact(payload) {
+  if (payload && Array.isArray(payload.columns) && Array.isArray(payload.rows)) {
+    return payload.rows.map(row => Object.fromEntries(payload.columns.map((key, i) => [key, row[i]])));
+  }
+  return payload;
+}
+
+// Promise of the /dashboard payload (complaints, polls and alerts fetched in one request)
+let dashboardBootstrap = null;
+
+function startDashboardBootstrap() {
+  const userId = currentUser ? currentUser.id : '';
+  dashboardBootstrap = fetch(`${API}/dashboard?user_id=${userId}&format=compact`)
+    .then(res => res.json())
+    .then(out => out.error ? null : {
+      complaints: decodeCompact(out.complaints),
+      polls: decodeCompact(out.polls),
+      alerts: decodeCompact(out.alerts),
+    })
+    .catch(() => null);
+}
+
+// Fetches a list endpoint in compact form. The first load of each list after login is
+// served from the dashboard bootstrap; each key is used once, so later views fetch fresh data.
+async function fetchList(path, bootstrapKey) {
+  const bootstrap = bootstrapKey && dashboardBootstrap ? await dashboardBootstrap : null;
+  if (bootstrap && bootstrap[bootstrapKey]) {
+    const rows = bootstrap[bootstrapKey];
+    delete bootstrap[bootstrapKey];
+    return rows;
+  }
+  const res = await fetch(`${API}${path}${path.includes('?') ? '&' : '?'}format=compact`);
+  return decodeCompact(await res.json());
+}
+
 // DOM Elements
 const homeView = document.getElementById("homeView");
 const loginView = document.getElementById("loginView");
@@ -58,6 +111,7 @@ const addUserMsg = document.getElementById("addUserMsg");
 const residentAlertsContainer = document.getElementById("residentAlertsContainer");
 const createAlertForm = document.getElementById("createAlertForm");
 const alertMessage = document.getElementById("alertMessage");
+const alertExpiry = document.getElementById("alertExpiry");
 const createAlertMsg = document.getElementById("createAlertMsg");
 const adminAlertList = document.getElementById("adminAlertList");
 
@@ -151,6 +205,7 @@ function showDashboard() {
   adminNav.classList.add("hidden");
   workerNav?.classList.add("hidden");
   residentAlertsContainer.innerHTML = ''; // NEW: Clear alerts container on dashboard load
+  startDashboardBootstrap();
 
   // Set up navs and load initial data based on role
   if (currentUser.role === "resident") {
@@ -571,8 +626,7 @@ async function loadComplaints(targetElement, viewType = 'all') {
   let pollQuestions = new Set();
   if (viewType === 'my' || viewType === 'all' || viewType === 'admin' || viewType === 'worker') {
       try {
-          const res = await fetch(`${API}/get_polls`);
-          const polls = await res.json();
+          const polls = await fetchList('/get_polls', 'polls');
           if (!polls.error) {
               pollQuestions = new Set(polls.map(p => p.question));
           }
@@ -585,8 +639,7 @@ async function loadComplaints(targetElement, viewType = 'all') {
   targetElement.innerHTML = '<div class="message info">Loading complaints...</div>';
   const userId = currentUser ? currentUser.id : '';
   try {
-    const res = await fetch(`${API}/get_complaints?user_id=${userId}&view_type=${viewType}`);
-    const allFetchedComplaints = await res.json(); 
+    const allFetchedComplaints = await fetchList(`/get_complaints?user_id=${userId}&view_type=${viewType}`, 'complaints');
 
     if (allFetchedComplaints.error) {
       targetElement.innerHTML = `<div class="message error">${allFetchedComplaints.error}</div>`;
@@ -800,8 +853,7 @@ async function loadPolls(targetElement, viewType = 'resident') {
   targetElement.innerHTML = '<div class="message info">Loading polls...</div>';
   const userId = currentUser ? currentUser.id : '';
   try {
-    const res = await fetch(`${API}/get_polls?user_id=${userId}`);
-    const polls = await res.json();
+    const polls = await fetchList(`/get_polls?user_id=${userId}`, 'polls');
     if (polls.error) {
       targetElement.innerHTML = `<div class="message error">${polls.error}</div>`;
       return;
@@ -967,8 +1019,7 @@ async function loadUsers() {
         return;
     }
     try {
-        const res = await fetch(`${API}/get_users`);
-        const users = await res.json();
+        const users = await fetchList('/get_users');
         if (users.error) {
             targetElement.innerHTML = `<div class="message error">${users.error}</div>`;
             return;
@@ -1242,6 +1293,7 @@ createAlertForm?.addEventListener("submit", async (e) => {
         user_id: currentUser.id,
         user_role: currentUser.role
     };
+    if (alertExpiry && alertExpiry.value) data.expires_in_hours = Number(alertExpiry.value);
     try {
         const res = await fetch(`${API}/create_alert`, {
             method: 'POST',
@@ -1262,18 +1314,24 @@ createAlertForm?.addEventListener("submit", async (e) => {
     }
 });
 
-async function loadAlertsForAdmin() {
+// Alerts are paged by created_at: each page asks for alerts older than the last one shown
+const ALERTS_PAGE_SIZE = 20;
+const RESIDENT_ALERT_BANNER_SIZE = 5;
+
+async function loadAlertsForAdmin(before = null) {
     if (!adminAlertList) return;
-    adminAlertList.innerHTML = '<div class="message info">Loading alerts...</div>';
+    if (!before) adminAlertList.innerHTML = '<div class="message info">Loading alerts...</div>';
     try {
-        const res = await fetch(`${API}/get_alerts`);
-        const alerts = await res.json();
+        const alerts = before
+            ? await fetchList(`/get_alerts?before=${encodeURIComponent(before)}&limit=${ALERTS_PAGE_SIZE}`)
+            : await fetchList(`/get_alerts?limit=${ALERTS_PAGE_SIZE}`, 'alerts');
         if (alerts.error) {
             adminAlertList.innerHTML = `<div class="message error">${alerts.error}</div>`;
             return;
         }
+        document.getElementById('loadOlderAlertsBtn')?.remove();
         if (alerts.length === 0) {
-            adminAlertList.innerHTML = '<div class="message info">No active alerts found.</div>';
+            if (!before) adminAlertList.innerHTML = '<div class="message info">No active alerts found.</div>';
             return;
         }
         let html = '';
@@ -1289,7 +1347,14 @@ async function loadAlertsForAdmin() {
                     </div>
                 </div>`;
         });
-        adminAlertList.innerHTML = html;
+        if (alerts.length === ALERTS_PAGE_SIZE) {
+            html += `<button type="button" id="loadOlderAlertsBtn" class="btn btn-small" onclick="loadAlertsForAdmin('${alerts[alerts.length - 1].created_at}')">Load older alerts</button>`;
+        }
+        if (before) {
+            adminAlertList.insertAdjacentHTML('beforeend', html);
+        } else {
+            adminAlertList.innerHTML = html;
+        }
     } catch (error) {
         console.error('Error loading admin alerts:', error);
         adminAlertList.innerHTML = `<div class="message error">Network error.</div>`;
@@ -1326,14 +1391,13 @@ async function deleteAlert(alertId) {
 async function loadAlertsForResident() {
     if (!residentAlertsContainer) return;
     try {
-        const res = await fetch(`${API}/get_alerts`);
-        const alerts = await res.json();
+        const alerts = await fetchList(`/get_alerts?limit=${RESIDENT_ALERT_BANNER_SIZE}`, 'alerts');
         if (alerts.error || alerts.length === 0) {
             residentAlertsContainer.innerHTML = '';
             return;
         }
         let html = '<div class="content-header" style="margin-bottom: 1rem;"><h2>📢Important Alerts</h2></div>';
-        alerts.forEach(alert => {
+        alerts.slice(0, RESIDENT_ALERT_BANNER_SIZE).forEach(alert => {
             html += `
                 <div class="message warning" style="margin-bottom: 1.5rem;">
                     <p style="font-weight: bold;">${alert.message}</p>
@@ -1,20 +1,53 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g, has_app_context
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
+from werkzeug.middleware.proxy_fix import ProxyFix
 from os import environ
 from datetime import datetime
 import traceback
 import os
+import re
 import secrets
 import json
+import csv
+import io
+import math
+import time
+import threading
+import gzip
+import heapq
+import hmac
+import random
+import sys
+import contextvars
+import click
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import wraps
 from werkzeug.utils import secure_filename
 
 # --- MongoDB Imports ---
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, ServerSelectionTimeoutError, WaitQueueTimeoutError
 from bson.objectid import ObjectId # Used for unique MongoDB IDs
 
+# Optional: brotli compression when the package is installed, gzip otherwise
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 app = Flask(__name__)
 CORS(app)
 
+# Number of proxies in front of the app that append to X-Forwarded-For (Vercel: 1).
+# Only those trailing entries are trusted; anything further left is client supplied.
+# Set to 0 when the app is exposed directly (e.g. uvicorn without a proxy).
+TRUSTED_PROXY_HOPS = int(environ.get("TRUSTED_PROXY_HOPS", "1"))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
 # --- File Upload Configuration (Unchanged) ---
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
@@ -28,42 +61,468 @@ if not os.path.exists(UPLOAD_FOLDER):
 # --- MongoDB Connection and Collection Setup (CRITICAL UPDATE) ---
 MONGO_URI = environ.get("MONGO_URI") 
 
-# Global declarations - collections will be assigned inside the try block
-users_collection = None
-complaints_collection = None
-alerts_collection = None
-polls_collection = None
-poll_votes_collection = None
-registration_requests_collection = None
-likes_collection = None
-house_requests_collection = None
+# --- Multi-tenant (society) configuration ---
+# Every document carries a society_id and every query is scoped by it. Societies
+# share the default database unless TENANT_DATABASES routes them elsewhere, e.g.
+# TENANT_DATABASES='{"greenpark": "societyvoice_greenpark"}'
+DEFAULT_DATABASE = "societyvoice"
+DEFAULT_SOCIETY_ID = environ.get("DEFAULT_SOCIETY_ID", "default")
+TENANT_DATABASES = json.loads(environ.get("TENANT_DATABASES") or "{}")
+SOCIETY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+TOMBSTONE_RETENTION_DAYS = 30 # How long /sync deletion records are kept (see CLIENT SYNC)
+
+client = None
+_indexed_databases = set()
+
+def ensure_indexes(database):
+    """Creates the uniqueness constraints and the society_id-led query indexes."""
+    # Ensure email uniqueness (equivalent to SQL UNIQUE)
+    database.users.create_index("email", unique=True)
+    database.registration_requests.create_index("email", unique=True)
+    database.complaint_likes.create_index([("complaint_id", 1), ("user_id", 1)], unique=True)
+
+    # Compound indexes led by society_id so one tenant's volume never slows another's queries
+    database.users.create_index([("society_id", 1), ("name", 1)])
+    database.registration_requests.create_index([("society_id", 1), ("created_at", -1)])
+    database.complaints.create_index([("society_id", 1), ("last_updated", -1)])
+    database.complaints.create_index([("society_id", 1), ("user_id", 1), ("last_updated", -1)])
+    database.polls.create_index([("society_id", 1), ("created_at", -1)])
+    database.poll_votes.create_index([("society_id", 1), ("poll_id", 1), ("option_index", 1)])
+    database.poll_votes.create_index([("society_id", 1), ("user_id", 1)])
+    database.alerts.create_index([("society_id", 1), ("created_at", -1)])
+    database.alerts.create_index("expires_at", expireAfterSeconds=0) # Alerts without expires_at never expire
+    database.house_change_requests.create_index([("society_id", 1), ("created_at", -1)])
+    database.house_change_requests.create_index([("society_id", 1), ("status", 1), ("created_at", -1)])
+    try:
+        # At most one pending request per user, enforced by the database instead of a racy find_one
+        database.house_change_requests.create_index(
+            "user_id", unique=True, name="one_pending_request_per_user",
+            partialFilterExpression={"status": "pending"})
+    except OperationFailure as e:
+        print(f"🚨 Could not create the pending house request index ({e}). Run `flask backfill-house-requests`.")
+
+    # Archival tier: the archiver's candidate scans and the include_archived reads
+    database.complaints.create_index([("status", 1), ("last_updated", 1)])
+    database.polls.create_index([("is_active", 1), ("closed_at", 1)])
+    database.complaints_archive.create_index([("society_id", 1), ("last_updated", -1)])
+    database.polls_archive.create_index([("society_id", 1), ("created_at", -1)])
+
+    # Client sync: changes since a token are read per society in sync_seq order
+    for name in ("complaints", "polls", "poll_votes", "alerts", "tombstones"):
+        database[name].create_index([("society_id", 1), ("sync_seq", 1)])
+        database[name].create_index([("society_id", 1), ("sync_at", 1)])
+    database.tombstones.create_index("sync_at", name="tombstone_retention",
+                                     expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400)
+
+    # Notifications written by background jobs; (job_id, user_id) makes fan-out retries idempotent
+    database.notifications.create_index([("society_id", 1), ("user_id", 1), ("created_at", -1)])
+    database.notifications.create_index([("job_id", 1), ("user_id", 1)], unique=True)
+
+def get_society_id():
+    """Returns the society of the current request (or CLI command), else the default."""
+    if has_app_context():
+        return g.get("society_id", DEFAULT_SOCIETY_ID)
+    return DEFAULT_SOCIETY_ID
+
+def requested_society_id(headers, args):
+    """Society named by the X-Society-ID header or ?society_id= argument (else the default); None if malformed."""
+    society_id = headers.get("X-Society-ID") or args.get("society_id") or DEFAULT_SOCIETY_ID
+    return society_id if SOCIETY_ID_PATTERN.match(society_id) else None
+
+def get_tenant_db(society_id=None):
+    """Returns the database holding the given (or current) society's data."""
+    name = TENANT_DATABASES.get(society_id or get_society_id(), DEFAULT_DATABASE)
+    database = client.get_database(name)
+    if name not in _indexed_databases:
+        ensure_indexes(database)
+        _indexed_databases.add(name)
+    return database
+
+def scoped(query=None):
+    """Adds the current society_id to a MongoDB filter."""
+    return {"society_id": get_society_id(), **(query or {})}
+
+def _tenant_collection(name):
+    # Resolved on every access so routes always talk to the current society's database
+    return LocalProxy(lambda: get_tenant_db()[name])
+
+users_collection = _tenant_collection("users")
+complaints_collection = _tenant_collection("complaints")
+alerts_collection = _tenant_collection("alerts")
+polls_collection = _tenant_collection("polls")
+poll_votes_collection = _tenant_collection("poll_votes")
+registration_requests_collection = _tenant_collection("registration_requests")
+likes_collection = _tenant_collection("complaint_likes")
+house_requests_collection = _tenant_collection("house_change_requests")
+
+
+# --- REQUEST PROFILING ---
+# Opt-in per-request profiling: requests carrying X-Profile-Token (matching PROFILE_TOKEN)
+# or picked at PROFILE_SAMPLE_RATE are sampled by a background thread that records the
+# stacks of the threads working on the request, plus a per-query timing breakdown.
+# Results go to PROFILE_DIR as <name>.folded (flame graph input, e.g. for speedscope or
+# flamegraph.pl) and <name>.json (timings and queries). Only the newest PROFILE_MAX_FILES
+# profiles are kept, so sampling left on in production cannot fill the disk.
+PROFILE_TOKEN = environ.get("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(environ.get("PROFILE_MAX_FILES", 200))
+PROFILE_INTERVAL_SECONDS = 0.005
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+class RequestProfile:
+    """Stack samples and query timings for one request."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.threads = {threading.get_ident()}
+        self.stacks = {}
+        self.queries = []
+        self.pending_queries = {}
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True, name="profiler")
+        self.sampler.start()
+
+    def sample(self):
+        while not self.stop.wait(PROFILE_INTERVAL_SECONDS):
+            frames = sys._current_frames()
+            with self.lock:
+                threads = list(self.threads)
+            for ident in threads:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    folded = ";".join(reversed(stack))
+                    self.stacks[folded] = self.stacks.get(folded, 0) + 1
+
+    def finish(self):
+        """Stops sampling once the response is built (so jsonify() is included)."""
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        self.stop.set()
+
+    def save(self, status_code):
+        self.sampler.join()
+        duration_ms = self.duration_ms
+        query_ms = sum(q["duration_ms"] for q in self.queries)
+        name = f"{self.started_at.strftime('%Y%m%d-%H%M%S')}-{self.path.strip('/').replace('/', '_') or 'root'}-{secrets.token_hex(3)}"
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, name + ".folded"), "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.items())
+        with open(os.path.join(PROFILE_DIR, name + ".json"), "w") as f:
+            json.dump({
+                "method": self.method,
+                "path": self.path,
+                "status": status_code,
+                "started_at": self.started_at.isoformat(),
+                "duration_ms": round(duration_ms, 2),
+                # Queries may overlap when run concurrently, so query_ms can exceed duration_ms
+                "query_ms": round(query_ms, 2),
+                "samples": sum(self.stacks.values()),
+                "queries": self.queries
+            }, f, indent=2)
+        print(f"🔬 Profile written: {os.path.join(PROFILE_DIR, name)} ({duration_ms:.1f} ms, {len(self.queries)} queries)")
+        prune_profiles()
+
+def prune_profiles():
+    """Deletes the oldest profiles beyond PROFILE_MAX_FILES (names start with their timestamp)."""
+    names = sorted(f[:-len(".json")] for f in os.listdir(PROFILE_DIR) if f.endswith(".json"))
+    for name in names[:max(len(names) - PROFILE_MAX_FILES, 0)]:
+        for ext in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name + ext))
+            except OSError:
+                pass # Already removed by a concurrent save
+
+class ProfileQueryListener(monitoring.CommandListener):
+    """Records commands issued while a profile is active (events fire on the issuing thread)."""
+
+    def started(self, event):
+        profile = current_profile.get()
+        if profile:
+            with profile.lock:
+                profile.pending_queries[event.request_id] = (event.command_name, event.command.get(event.command_name))
+
+    def succeeded(self, event):
+        self.finish(event, "ok")
+
+    def failed(self, event):
+        self.finish(event, "failed")
+
+    def finish(self, event, outcome):
+        profile = current_profile.get()
+        if profile:
+            with profile.lock:
+                command, collection = profile.pending_queries.pop(event.request_id, (event.command_name, None))
+                profile.queries.append({
+                    "command": command,
+                    "collection": collection if isinstance(collection, str) else None,
+                    "database": event.database_name,
+                    "duration_ms": round(event.duration_micros / 1000, 3),
+                    "outcome": outcome
+                })
+
+def profiled(fn):
+    """Carries the current profile into a worker thread so its stacks and queries are captured too."""
+    profile = current_profile.get()
+    if not profile:
+        return fn
+    def run():
+        token = current_profile.set(profile)
+        ident = threading.get_ident()
+        with profile.lock:
+            profile.threads.add(ident)
+        try:
+            return fn()
+        finally:
+            with profile.lock:
+                profile.threads.discard(ident)
+            current_profile.reset(token)
+    return run
+
+@app.before_request
+def start_profile():
+    token = request.headers.get("X-Profile-Token")
+    requested = bool(PROFILE_TOKEN and token and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()))
+    if requested or (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE):
+        g.profile_token = current_profile.set(RequestProfile(request.method, request.path))
+
+@app.after_request
+def finish_profile(response):
+    profile = current_profile.get()
+    if profile:
+        profile.finish()
+        # Written once the response has been sent so the client does not wait on disk I/O
+        response.call_on_close(lambda: profile.save(response.status_code))
+    return response
+
+@app.teardown_request
+def clear_profile(exc):
+    token = g.pop("profile_token", None)
+    if token:
+        current_profile.reset(token)
+
+profile_query_listener = ProfileQueryListener()
+
+
+# --- DATABASE HEALTH & CIRCUIT BREAKER ---
+# PyMongo event listeners feed connection pool/command statistics (reported by /health)
+# and a circuit breaker. While the breaker is open, routes fail fast with 503 (read
+# routes serve their last good response) instead of each blocking on server selection.
+# Every operation is bounded by MONGO_TIMEOUT_MS, so a slow (not just unreachable) server
+# surfaces as timeouts that count as failures. Set MONGO_TIMEOUT_MS=0 for no limit, e.g.
+# when running the maintenance commands against a large collection.
+MONGO_TIMEOUT_MS = int(environ.get("MONGO_TIMEOUT_MS", 10000))
+CIRCUIT_FAILURE_THRESHOLD = 5   # Consecutive database failures that open the circuit
+CIRCUIT_RESET_SECONDS = 30      # How long to stay open before letting a probe request through
+CIRCUIT_PROBE_TIMEOUT_SECONDS = 15 # A probe with no recorded outcome by then is replaced by another
+# Server error codes treated as the database being unhealthy (50 = MaxTimeMSExpired)
+UNHEALTHY_ERROR_CODES = {50}
+NETWORK_ERROR_TYPES = {"AutoReconnect", "NetworkTimeout", "ConnectionFailure", "NotPrimaryError"}
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0
+
+class CircuitBreaker:
+    """closed -> open after CIRCUIT_FAILURE_THRESHOLD consecutive failures; open -> half-open after
+    CIRCUIT_RESET_SECONDS, letting one probe through; the probe's outcome closes or re-opens it.
+    A probe that never reaches the database (a 404, a 400, a preflight) records no outcome, so
+    after probe_timeout seconds without one the next request becomes the probe."""
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS,
+                 probe_timeout=CIRCUIT_PROBE_TIMEOUT_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.probe_timeout = probe_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self.probe_started_at = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            if ((self.state == "open" and now - self.opened_at >= self.reset_seconds)
+                    or (self.state == "half-open" and now - self.probe_started_at >= self.probe_timeout)):
+                self.state = "half-open"
+                self.probe_started_at = now
+                return True
+            return self.state == "closed"
+
+    def retry_after(self):
+        if self.state == "half-open":
+            return max(1, math.ceil(self.probe_timeout - (time.monotonic() - self.probe_started_at)))
+        return max(1, math.ceil(self.reset_seconds - (time.monotonic() - self.opened_at)))
+
+    def record_success(self):
+        with self.lock:
+            if self.state != "closed":
+                print("✅ Database recovered, circuit closed")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                print(f"🚨 Database degraded after {self.failures} failures, circuit open")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Checked-out connections and checkout wait times across all pools."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.open_connections = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.waits_ms = deque(maxlen=1000)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    # Wait times come from the events themselves (pymongo 4.7+): with the async client all
+    # checkouts share one thread, so timing them per thread would mix up overlapping waits
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.waits_ms.append((event.duration or 0) * 1000)
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.checkout_failures += 1
+            self.waits_ms.append((event.duration or 0) * 1000)
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self.lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.open_connections -= 1
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+
+    def snapshot(self):
+        with self.lock:
+            waits = list(self.waits_ms)
+            return {
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "open_connections": self.open_connections,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_ms_avg": round(sum(waits) / len(waits), 2) if waits else 0,
+                "wait_ms_p95": round(percentile(waits, 0.95), 2),
+                "wait_ms_max": round(max(waits), 2) if waits else 0
+            }
+
+class QueryStats(monitoring.CommandListener, monitoring.ServerHeartbeatListener):
+    """Command latency/failures and server heartbeats; network-level failures trip the breaker."""
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self.lock = threading.Lock()
+        self.commands_succeeded = 0
+        self.commands_failed = 0
+        self.durations_ms = deque(maxlen=1000)
+        self.last_error = None
+        self.last_heartbeat_ok = None
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        # Command and heartbeat "succeeded" events share this name
+        if isinstance(event, monitoring.ServerHeartbeatSucceededEvent):
+            # A server can answer heartbeats while queries time out, so only commands close the circuit
+            self.last_heartbeat_ok = True
+            return
+        with self.lock:
+            self.commands_succeeded += 1
+            self.durations_ms.append(event.duration_micros / 1000)
+        self.breaker.record_success()
+
+    def failed(self, event):
+        if isinstance(event, monitoring.ServerHeartbeatFailedEvent):
+            self.last_heartbeat_ok = False
+            self.last_error = str(event.reply)
+            self.breaker.record_failure()
+            return
+        with self.lock:
+            self.commands_failed += 1
+            self.durations_ms.append(event.duration_micros / 1000)
+        failure = event.failure or {}
+        if failure.get("errtype") in NETWORK_ERROR_TYPES or failure.get("code") in UNHEALTHY_ERROR_CODES:
+            self.last_error = failure.get("errmsg")
+            self.breaker.record_failure()
+
+    def snapshot(self):
+        with self.lock:
+            durations = list(self.durations_ms)
+            return {
+                "succeeded": self.commands_succeeded,
+                "failed": self.commands_failed,
+                "duration_ms_p50": round(percentile(durations, 0.5), 2),
+                "duration_ms_p95": round(percentile(durations, 0.95), 2),
+                "last_heartbeat_ok": self.last_heartbeat_ok,
+                "last_error": self.last_error
+            }
+
+circuit_breaker = CircuitBreaker()
+pool_stats = PoolStats()
+query_stats = QueryStats(circuit_breaker)
+
+def record_database_error(error):
+    """Called from route error handlers for failures raised before any command is sent
+    (no server selectable, no pool connection in time), which QueryStats never sees."""
+    if isinstance(error, (ServerSelectionTimeoutError, WaitQueueTimeoutError)):
+        with query_stats.lock:
+            query_stats.last_error = str(error)
+        circuit_breaker.record_failure()
 
 if MONGO_URI:
     try:
         # Connect to the MongoDB client
         # Added a timeout to prevent indefinite waiting if the URI is wrong/network blocked
-        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000) 
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, timeoutMS=MONGO_TIMEOUT_MS,
+                             event_listeners=[pool_stats, query_stats, profile_query_listener]) 
         
         # Test the connection by sending a command. This is where the app will crash if the URI is bad or network is blocked.
         client.admin.command('ping') 
         print("✅ Successfully connected to MongoDB Atlas!") # You must see this in Vercel logs
         
-        # If connection succeeds, assign the collections
-        db = client.get_database("societyvoice") 
-        
-        users_collection = db.users
-        complaints_collection = db.complaints
-        alerts_collection = db.alerts
-        polls_collection = db.polls
-        poll_votes_collection = db.poll_votes
-        registration_requests_collection = db.registration_requests
-        likes_collection = db.complaint_likes
-        house_requests_collection = db.house_change_requests
+        # If connection succeeds, initialize the default database (indexes are created on first use)
+        db = get_tenant_db(DEFAULT_SOCIETY_ID)
 
-        # Initialize Admin User and Indexes
-        admin_count = users_collection.count_documents({"role": "admin"})
+        # Initialize Admin User
+        admin_count = db.users.count_documents({"role": "admin"})
         if admin_count == 0:
-            users_collection.insert_one({
+            db.users.insert_one({
+                "society_id": DEFAULT_SOCIETY_ID,
                 "name": "Admin", 
                 "email": "admin@society.com", 
                 "password": "admin123", # NOTE: Hash this password in a real app!
@@ -72,11 +531,6 @@ if MONGO_URI:
                 "created_at": datetime.now().isoformat()
             })
             print("✅ Initial admin user created.")
-        
-        # Ensure email uniqueness (equivalent to SQL UNIQUE)
-        users_collection.create_index("email", unique=True)
-        registration_requests_collection.create_index("email", unique=True)
-        likes_collection.create_index([("complaint_id", 1), ("user_id", 1)], unique=True)
 
     except Exception as e:
         # This will print the actual MongoDB error (e.g., Auth failure) to Vercel logs
@@ -91,6 +545,218 @@ else:
 # --- END MongoDB Connection ---
 
 
+# --- RATE LIMITING ---
+# Token buckets keyed by user and by client IP. Limits are (requests per minute, burst);
+# IP buckets get IP_LIMIT_MULTIPLIER times more room since a whole society can share one IP.
+RATE_LIMITS = {
+    "login": (10, 5),
+    "submit_complaint": (10, 5),
+    "like_complaint": (60, 20),
+    "vote_poll": (30, 10),
+}
+IP_LIMIT_MULTIPLIER = 5
+RATE_LIMIT_MAX_KEYS = int(environ.get("RATE_LIMIT_MAX_KEYS", 50000))
+# "memory" keeps buckets per process; "mongo" shares them across instances
+RATE_LIMIT_BACKEND = environ.get("RATE_LIMIT_BACKEND", "memory")
+
+class TokenBucketLimiter:
+    """In-process token buckets held in a bounded LRU map.
+
+    Lookups are O(1) and memory is capped at max_keys buckets; the least recently
+    seen key is evicted first (it simply starts again with a full bucket)."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, rate, capacity):
+        """Takes one token. Returns 0 if allowed, else the seconds until a token is available."""
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return 0 if allowed else (1 - tokens) / rate
+
+class MongoTokenBucketLimiter:
+    """Token buckets stored in a MongoDB collection, updated atomically with one round trip."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        # Idle buckets are full again after a while, so they can simply expire
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def consume(self, key, rate, capacity):
+        now = datetime.utcnow()
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}, rate]}
+        ]}]}
+        bucket = self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now,
+                          "expires_at": now + timedelta(seconds=capacity / rate)}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0 if bucket["allowed"] else (1 - bucket["tokens"]) / rate
+
+if RATE_LIMIT_BACKEND == "mongo":
+    rate_limiter = MongoTokenBucketLimiter(client.get_database(DEFAULT_DATABASE).rate_limits)
+else:
+    rate_limiter = TokenBucketLimiter()
+
+def get_client_ip():
+    """Returns the client IP as seen by the trusted proxy (ProxyFix sets remote_addr)."""
+    return request.remote_addr or "unknown"
+
+def request_user_key():
+    """Identifies the acting user from the JSON body or form (email for /login)."""
+    data = request.get_json(silent=True) or request.form
+    return data.get("user_id") or data.get("email")
+
+def rate_limited(name):
+    """Rejects the request with 429 once the user's or the IP's bucket for `name` is empty."""
+    per_minute, burst = RATE_LIMITS[name]
+    rate = per_minute / 60.0
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_key = request_user_key()
+            try:
+                retry_after = rate_limiter.consume(
+                    f"{name}:ip:{get_client_ip()}", rate * IP_LIMIT_MULTIPLIER, burst * IP_LIMIT_MULTIPLIER)
+                if not retry_after and user_key:
+                    retry_after = rate_limiter.consume(f"{name}:user:{user_key}", rate, burst)
+            except Exception as e:
+                # Fail open: a limiter outage must not take the route down with it
+                print(f"❌ Rate limiter error: {e}")
+                retry_after = 0
+
+            if retry_after:
+                print(f"🚦 Rate limit hit on {name} for {user_key or get_client_ip()}")
+                response = jsonify({"error": "Too many requests. Please try again shortly."})
+                response.headers["Retry-After"] = str(math.ceil(retry_after))
+                return response, 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- RESPONSE COMPRESSION & COMPACT LISTS ---
+COMPRESSION_MIN_SIZE = 1024 # Smaller bodies are not worth the CPU or the header overhead
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def compress_body(body, accept_encoding):
+    """Returns (compressed_body, encoding) for the client's Accept-Encoding, or (body, None)."""
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return body, None
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli and "br" in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype != "application/json"):
+        return response
+    body, encoding = compress_body(response.get_data(), request.headers.get("Accept-Encoding", ""))
+    response.headers.add("Vary", "Accept-Encoding")
+    if encoding:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def to_columnar(rows):
+    """Compact list encoding: keys are sent once, followed by one value array per row."""
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return {"columns": columns, "rows": [[row.get(key) for key in columns] for row in rows]}
+
+def wants_compact(args):
+    return args.get("format") == "compact"
+
+def list_payload(rows, args):
+    """A list endpoint's rows, columnar when the client asked for ?format=compact."""
+    return to_columnar(rows) if wants_compact(args) else rows
+
+def list_response(rows):
+    return jsonify(list_payload(rows, request.args))
+
+
+# Last good response per read URL, served while the circuit is open
+STALE_CACHE_ROUTES = {"/get_complaints", "/get_polls", "/get_alerts", "/dashboard", "/admin/get_users"}
+STALE_CACHE_MAX_ENTRIES = 500
+stale_responses = OrderedDict()
+stale_responses_lock = threading.Lock()
+
+CIRCUIT_OPEN_ERROR = {"error": "Service temporarily unavailable. Please try again shortly."}
+
+# These take the request's headers/path rather than reading flask.request, so the async
+# routes in asgi.py share the same breaker and cache
+def stale_cache_key(headers, full_path):
+    # Runs before resolve_society(), so the society comes straight from the header (full_path has the args)
+    return (headers.get("X-Society-ID", ""), full_path)
+
+def stale_response_body(key):
+    with stale_responses_lock:
+        return stale_responses.get(key)
+
+def remember_stale_response(key, body):
+    with stale_responses_lock:
+        stale_responses[key] = body
+        stale_responses.move_to_end(key)
+        if len(stale_responses) > STALE_CACHE_MAX_ENTRIES:
+            stale_responses.popitem(last=False)
+
+@app.before_request
+def check_circuit():
+    if request.path == "/health" or request.path.startswith("/uploads/") or circuit_breaker.allow():
+        return None
+    if request.method == "GET" and request.path in STALE_CACHE_ROUTES:
+        body = stale_response_body(stale_cache_key(request.headers, request.full_path))
+        if body is not None:
+            response = app.response_class(body, mimetype="application/json")
+            response.headers["X-Served-Stale"] = "1"
+            return response
+    response = jsonify(CIRCUIT_OPEN_ERROR)
+    response.headers["Retry-After"] = str(circuit_breaker.retry_after())
+    return response, 503
+
+@app.after_request
+def remember_good_response(response):
+    # Registered after compress_response, so it runs first and stores the uncompressed body
+    if (request.method == "GET" and request.path in STALE_CACHE_ROUTES and response.status_code == 200
+            and "X-Served-Stale" not in response.headers):
+        remember_stale_response(stale_cache_key(request.headers, request.full_path), response.get_data())
+    return response
+
+@app.route("/health", methods=["GET"])
+def health():
+    healthy = circuit_breaker.state == "closed" and query_stats.last_heartbeat_ok is not False
+    return jsonify({
+        "status": "ok" if healthy else "degraded",
+        "circuit": circuit_breaker.state,
+        "pool": pool_stats.snapshot(),
+        "queries": query_stats.snapshot()
+    }), 200 if healthy else 503
+
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -98,6 +764,14 @@ def allowed_file(filename):
 def uploaded_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+@app.before_request
+def resolve_society():
+    """Reads the society scope from the X-Society-ID header or ?society_id= argument."""
+    society_id = requested_society_id(request.headers, request.args)
+    if not society_id:
+        return jsonify({"error": "Invalid society ID"}), 400
+    g.society_id = society_id
+
 # --- HELPER FUNCTIONS ---
 def prepare_document(doc):
     """Converts MongoDB document to a JSON-safe dictionary."""
@@ -112,6 +786,593 @@ def to_object_id(id_str):
     except Exception:
         return None
 
+def insert_many_ignoring_duplicates(collection, docs):
+    """insert_many that tolerates documents already written by an interrupted earlier attempt."""
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as bwe:
+        if any(e.get("code") != 11000 for e in bwe.details.get("writeErrors", [])):
+            raise
+
+
+# --- READ PATH BUILDERS (shared by the WSGI routes and the async mode in asgi.py) ---
+
+# Independent read queries run side by side on this pool. Pool threads have no
+# request context, so queries must use an explicit database and scope rather
+# than the per-request collection proxies or scoped().
+QUERY_POOL_SIZE = int(environ.get("QUERY_POOL_SIZE", 16))
+query_pool = ThreadPoolExecutor(max_workers=QUERY_POOL_SIZE, thread_name_prefix="query")
+
+def run_concurrently(*queries):
+    """Runs zero-argument query callables on the query pool and returns their results in order."""
+    futures = [query_pool.submit(profiled(query)) for query in queries]
+    return [future.result() for future in futures]
+
+def complaints_match_query(scope, args):
+    """Complaints filter for a request's args: residents asking with their user_id see only their own."""
+    match_query = dict(scope)
+    user_id_str = args.get("user_id")
+    if args.get("user_role") == 'resident' and user_id_str:
+        user_id = to_object_id(user_id_str)
+        if user_id:
+            match_query["user_id"] = user_id
+    return match_query
+
+def poll_queries(database, scope, user_obj_id=None):
+    """The three independent queries behind the polls list: polls, vote counts and the user's own votes."""
+    return (
+        lambda: list(database.polls.find(scope).sort("created_at", -1)),
+        lambda: list(database.poll_votes.aggregate(poll_vote_counts_pipeline(scope))),
+        lambda: list(database.poll_votes.find({**scope, "user_id": user_obj_id})) if user_obj_id else None,
+    )
+
+def complaints_pipeline(match_query):
+    """Aggregation Pipeline to join complaints with user names and like counts."""
+    return [
+        # 1. Filter complaints based on the user_role (if resident)
+        {"$match": match_query},
+        
+        # 2. Join with users collection to get the name of the submitter
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "_id",
+            "as": "user_info"
+        }},
+        # 3. Join with likes collection to calculate the like count
+        {"$lookup": {
+            "from": "complaint_likes",
+            "localField": "_id",
+            "foreignField": "complaint_id",
+            "as": "likes"
+        }},
+        # 4. Project the final fields
+        {"$project": {
+            "_id": {"$toString": "$_id"}, # Convert ObjectId to string
+            "title": 1,
+            "description": 1,
+            "category": 1,
+            "status": 1,
+            "image_url": 1,
+            "created_at": 1,
+            "last_updated": 1,
+            "user_id": {"$toString": "$user_id"},
+            "user_name": {"$arrayElemAt": ["$user_info.name", 0]}, # Get the name from the joined array
+            "like_count": {"$size": "$likes"}, # Count the number of likes
+            "liking_users": {"$map": { # Get a list of user_ids that liked this complaint
+                "input": "$likes",
+                "as": "like",
+                "in": {"$toString": "$$like.user_id"}
+            }}
+        }},
+        # 5. Sort by last_updated (newest first)
+        {"$sort": {"last_updated": -1}}
+    ]
+
+def poll_vote_counts_pipeline(match_query):
+    """Vote counts per poll and option. Matching on the society alone (rather than
+    the fetched poll ids) lets this run independently of the polls query."""
+    return [
+        {"$match": match_query},
+        {"$group": {
+            "_id": {"poll_id": "$poll_id", "option_index": "$option_index"},
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "poll_id": {"$toString": "$_id.poll_id"},
+            "option_index": "$_id.option_index",
+            "count": 1,
+            "_id": 0
+        }}
+    ]
+
+def assemble_polls(polls, vote_counts, user_votes=None):
+    """Attaches results/total_votes (and user_voted_index when user_votes is given) to polls."""
+    # Convert _id to string for all documents
+    polls = [prepare_document(p) for p in polls]
+    for poll in polls:
+        poll.pop("sync_at", None) # /sync bookkeeping (a BSON date), not part of the poll as clients see it
+
+    # Restructure votes into a dictionary for easy lookup
+    votes_dict = {}
+    for vc in vote_counts:
+        poll_id = vc["poll_id"]
+        if poll_id not in votes_dict:
+            votes_dict[poll_id] = {}
+        votes_dict[poll_id][vc["option_index"]] = vc["count"]
+
+    # Finalize poll data with vote counts
+    for poll in polls:
+        poll_id = poll["_id"]
+        total_votes = 0
+        poll['results'] = []
+        
+        for i, option in enumerate(poll['options']):
+            count = votes_dict.get(poll_id, {}).get(i, 0)
+            total_votes += count
+            poll['results'].append({
+                "option": option,
+                "count": count
+            })
+        poll['total_votes'] = total_votes
+
+    if user_votes is not None:
+        user_votes_map = {str(v["poll_id"]): v["option_index"] for v in user_votes}
+        for poll in polls:
+            poll['user_voted_index'] = user_votes_map.get(poll["_id"], -1)
+
+    return polls
+
+# Alerts carry created_by_name (denormalised at write time), so the feed is a
+# single indexed read on (society_id, created_at) with no join.
+ALERTS_PAGE_SIZE = 20
+ALERTS_MAX_PAGE_SIZE = 100
+ALERT_PROJECTION = {"message": 1, "created_at": 1, "created_by_name": 1, "expires_at": 1}
+
+def alerts_filter(scope, before=None):
+    """Unexpired alerts, newer pages first. The TTL monitor only deletes expired alerts
+    about once a minute, so expiry is also enforced here."""
+    query = {**scope, "expires_at": {"$not": {"$lte": datetime.utcnow()}}}
+    if before:
+        query["created_at"] = {"$lt": before}
+    return query
+
+def page_args(args, default_limit=20, max_limit=100):
+    """(before, limit) from ?before=<created_at of the last item seen>&limit=N."""
+    try:
+        limit = min(max(int(args.get("limit", default_limit)), 1), max_limit)
+    except ValueError:
+        limit = default_limit
+    return args.get("before"), limit
+
+def alerts_page_args(args):
+    return page_args(args, ALERTS_PAGE_SIZE, ALERTS_MAX_PAGE_SIZE)
+
+def prepare_alert(alert):
+    alert["_id"] = str(alert["_id"])
+    if alert.get("expires_at"):
+        alert["expires_at"] = alert["expires_at"].isoformat() + "Z"
+    return alert
+
+def alerts_query(database, scope, before=None, limit=ALERTS_PAGE_SIZE):
+    alerts = database.alerts.find(alerts_filter(scope, before), ALERT_PROJECTION).sort("created_at", -1).limit(limit)
+    return [prepare_alert(a) for a in alerts]
+
+
+# --- MAINTENANCE COMMANDS ---
+
+@app.cli.command("backfill-society")
+@click.option("--society", default=DEFAULT_SOCIETY_ID, show_default=True)
+def backfill_society_command(society):
+    """Assigns documents created before multi-tenancy to a society."""
+    database = get_tenant_db(society)
+    for name in ("users", "complaints", "alerts", "polls", "poll_votes",
+                 "registration_requests", "complaint_likes", "house_change_requests"):
+        result = database[name].update_many({"society_id": {"$exists": False}}, {"$set": {"society_id": society}})
+        click.echo(f"✅ {name}: {result.modified_count} documents assigned to {society}")
+
+@app.cli.command("backfill-alert-names")
+@click.option("--society", default=DEFAULT_SOCIETY_ID, show_default=True)
+def backfill_alert_names_command(society):
+    """Copies the creator's name onto alerts created before it was denormalised."""
+    database = get_tenant_db(society)
+    database.alerts.aggregate([
+        {"$match": {"created_by_name": {"$exists": False}}},
+        {"$lookup": {"from": "users", "localField": "created_by", "foreignField": "_id", "as": "creator"}},
+        {"$project": {"created_by_name": {"$ifNull": [{"$arrayElemAt": ["$creator.name", 0]}, None]}}},
+        {"$merge": {"into": "alerts", "whenMatched": "merge", "whenNotMatched": "discard"}}
+    ])
+    click.echo("✅ Alert creator names backfilled")
+
+@app.cli.command("backfill-house-requests")
+@click.option("--society", default=DEFAULT_SOCIETY_ID, show_default=True)
+def backfill_house_requests_command(society):
+    """Rejects duplicate pending house requests (keeping each user's newest) and copies user fields onto requests."""
+    database = get_tenant_db(society)
+    duplicates = database.house_change_requests.aggregate([
+        {"$match": {"status": "pending"}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": "$user_id", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ])
+    stale_ids = [request_id for d in duplicates for request_id in d["ids"][1:]]
+    if stale_ids:
+        database.house_change_requests.update_many({"_id": {"$in": stale_ids}}, {"$set": {"status": "rejected"}})
+    database.house_change_requests.aggregate([
+        {"$match": {"user_name": {"$exists": False}}},
+        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "_id", "as": "user_info"}},
+        {"$unwind": "$user_info"},
+        {"$project": {
+            "user_name": "$user_info.name",
+            "user_email": "$user_info.email",
+            "current_house_number": "$user_info.house_number"
+        }},
+        {"$merge": {"into": "house_change_requests", "whenMatched": "merge", "whenNotMatched": "discard"}}
+    ])
+    ensure_indexes(database)
+    click.echo(f"✅ {len(stale_ids)} duplicate pending requests rejected, user fields backfilled")
+
+
+
+# --- ARCHIVAL TIER ---
+# Resolved complaints and closed polls older than ARCHIVE_AFTER_DAYS move, together
+# with their likes/votes, into *_archive collections that store the final counts.
+# This keeps the hot collections (and every list aggregation over them) small.
+# ?include_archived=1 adds the newest ARCHIVE_PAGE_SIZE archived items to a list;
+# adding &before=<last archived item's timestamp> returns just the next archive page.
+ARCHIVE_AFTER_DAYS = int(environ.get("ARCHIVE_AFTER_DAYS", 30))
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_PAGE_SIZE = 50
+ARCHIVE_MAX_PAGE_SIZE = 200
+
+def archive_complaints(database, cutoff):
+    """Moves complaints resolved before `cutoff` (ISO string) and their likes to complaints_archive."""
+    archived = 0
+    archivable = {"status": "resolved", "last_updated": {"$lt": cutoff}}
+    while True:
+        complaints = list(database.complaints.find(archivable).limit(ARCHIVE_BATCH_SIZE))
+        if not complaints:
+            return archived
+
+        complaint_ids = [c["_id"] for c in complaints]
+        likes_by_complaint = {}
+        for like in database.complaint_likes.find({"complaint_id": {"$in": complaint_ids}}, {"complaint_id": 1, "user_id": 1}):
+            likes_by_complaint.setdefault(like["complaint_id"], []).append(str(like["user_id"]))
+        user_names = {u["_id"]: u["name"] for u in database.users.find(
+            {"_id": {"$in": list({c["user_id"] for c in complaints})}}, {"name": 1})}
+
+        archived_at = datetime.now().isoformat()
+        for complaint in complaints:
+            liking_users = likes_by_complaint.get(complaint["_id"], [])
+            complaint.update({
+                "user_name": user_names.get(complaint["user_id"]),
+                "like_count": len(liking_users),
+                "liking_users": liking_users,
+                "archived_at": archived_at
+            })
+
+        # Archive first, then delete: a crash in between only leaves a re-archivable duplicate.
+        # The delete repeats the filter: a complaint reopened since the find stays live, and
+        # its archive copy is dropped again.
+        insert_many_ignoring_duplicates(database.complaints_archive, complaints)
+        result = database.complaints.delete_many({**archivable, "_id": {"$in": complaint_ids}})
+        if result.deleted_count < len(complaint_ids):
+            reopened = {c["_id"] for c in database.complaints.find({"_id": {"$in": complaint_ids}}, {"_id": 1})}
+            database.complaints_archive.delete_many({"_id": {"$in": list(reopened)}})
+            complaints = [c for c in complaints if c["_id"] not in reopened]
+            complaint_ids = [c["_id"] for c in complaints]
+        database.complaint_likes.delete_many({"complaint_id": {"$in": complaint_ids}})
+        record_tombstones(database, "complaint", complaints, reason="archived")
+        archived += len(complaints)
+
+def archive_polls(database, cutoff):
+    """Moves polls closed before `cutoff` (ISO string) and their votes to polls_archive."""
+    archived = 0
+    while True:
+        polls = list(database.polls.find({"is_active": False, "$or": [
+            {"closed_at": {"$lt": cutoff}},
+            # Polls closed before closed_at was recorded
+            {"closed_at": {"$exists": False}, "created_at": {"$lt": cutoff}}
+        ]}).limit(ARCHIVE_BATCH_SIZE))
+        if not polls:
+            return archived
+
+        poll_ids = [p["_id"] for p in polls]
+        votes_by_poll = {}
+        for vote in database.poll_votes.find({"poll_id": {"$in": poll_ids}}, {"poll_id": 1, "user_id": 1, "option_index": 1}):
+            votes_by_poll.setdefault(vote["poll_id"], []).append(
+                {"user_id": vote["user_id"], "option_index": vote["option_index"]})
+
+        archived_at = datetime.now().isoformat()
+        for poll in polls:
+            votes = votes_by_poll.get(poll["_id"], [])
+            counts = [0] * len(poll["options"])
+            for vote in votes:
+                if 0 <= vote["option_index"] < len(counts):
+                    counts[vote["option_index"]] += 1
+            poll.update({
+                "results": [{"option": option, "count": count} for option, count in zip(poll["options"], counts)],
+                "total_votes": sum(counts),
+                "votes": votes,
+                "archived_at": archived_at
+            })
+
+        insert_many_ignoring_duplicates(database.polls_archive, polls)
+        record_tombstones(database, "poll", polls, reason="archived")
+        database.poll_votes.delete_many({"poll_id": {"$in": poll_ids}})
+        database.polls.delete_many({"_id": {"$in": poll_ids}})
+        archived += len(polls)
+
+# Bookkeeping fields left out of archived rows so they have the same keys as live rows
+ARCHIVE_EXCLUDED_FIELDS = {"society_id": 0, "archived_at": 0, "sync_seq": 0, "sync_at": 0}
+
+def archived_complaints_query(database, match_query, before=None, limit=ARCHIVE_PAGE_SIZE):
+    """A page of archived complaints (newest last_updated first) in the same shape as complaints_pipeline() rows."""
+    if before:
+        match_query = {**match_query, "last_updated": {"$lt": before}}
+    def query():
+        complaints = []
+        cursor = database.complaints_archive.find(match_query, ARCHIVE_EXCLUDED_FIELDS)
+        for complaint in cursor.sort("last_updated", -1).limit(limit):
+            complaint["_id"] = str(complaint["_id"])
+            complaint["user_id"] = str(complaint["user_id"])
+            complaint["archived"] = True
+            complaints.append(complaint)
+        return complaints
+    return query
+
+def archived_polls_query(database, scope, user_obj_id=None, before=None, limit=ARCHIVE_PAGE_SIZE):
+    """A page of archived polls (newest first) in the same shape as assemble_polls() output."""
+    if before:
+        scope = {**scope, "created_at": {"$lt": before}}
+    def query():
+        polls = list(database.polls_archive.find(scope, {**ARCHIVE_EXCLUDED_FIELDS, "votes": 0})
+                     .sort("created_at", -1).limit(limit))
+        user_votes = {}
+        if user_obj_id and polls:
+            # $elemMatch returns just this user's vote instead of every archived vote
+            user_votes = {p["_id"]: p["votes"][0]["option_index"] for p in database.polls_archive.find(
+                {"_id": {"$in": [p["_id"] for p in polls]}, "votes.user_id": user_obj_id},
+                {"votes": {"$elemMatch": {"user_id": user_obj_id}}})}
+        for poll in polls:
+            if user_obj_id:
+                poll["user_voted_index"] = user_votes.get(poll["_id"], -1)
+            prepare_document(poll)
+            poll["user_id"] = str(poll["user_id"])
+            poll["archived"] = True
+        return polls
+    return query
+
+def wants_archived(args):
+    return args.get("include_archived") in ("1", "true")
+
+def archive_page_args(args):
+    return page_args(args, ARCHIVE_PAGE_SIZE, ARCHIVE_MAX_PAGE_SIZE)
+
+@app.cli.command("archive")
+@click.option("--days", default=ARCHIVE_AFTER_DAYS, show_default=True,
+              help="Archive items resolved/closed more than this many days ago.")
+def archive_command(days):
+    """Moves old resolved complaints and closed polls into the archive collections (run from cron)."""
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    for name in sorted({DEFAULT_DATABASE, *TENANT_DATABASES.values()}):
+        database = client.get_database(name)
+        ensure_indexes(database)
+        complaints = archive_complaints(database, cutoff)
+        polls = archive_polls(database, cutoff)
+        click.echo(f"✅ {name}: archived {complaints} complaints and {polls} polls")
+
+
+
+# --- BACKGROUND JOB QUEUE ---
+# Post-write side effects (notifying residents) are queued by the route and run
+# by a separate worker (`flask worker`), so request latency does not depend on
+# fan-out size. JOB_QUEUE_BACKEND=local swaps the MongoDB-backed queue for an
+# in-process stand-in (handy for local development).
+JOB_QUEUE_BACKEND = environ.get("JOB_QUEUE_BACKEND", "mongo")
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_SECONDS = 10      # Doubles after every failed attempt...
+JOB_MAX_BACKOFF_SECONDS = 3600 # ...up to an hour
+JOB_LEASE_SECONDS = 300       # A running job not finished within this is assumed lost and re-claimed
+JOB_RETENTION_DAYS = 7        # Finished (done/failed) jobs are kept this long for inspection
+NOTIFICATION_BATCH_SIZE = 500
+
+JOB_HANDLERS = {}
+
+def job_handler(job_type):
+    """Registers fn(database, job) as the handler for job_type; job["payload"] holds its arguments."""
+    def decorator(fn):
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return decorator
+
+def job_backoff(attempts):
+    return min(JOB_BACKOFF_SECONDS * 2 ** (attempts - 1), JOB_MAX_BACKOFF_SECONDS)
+
+def seconds_from_now(seconds):
+    return (datetime.now() + timedelta(seconds=seconds)).isoformat()
+
+class MongoJobQueue:
+    """Durable job queue stored in the default database's jobs collection."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index([("status", 1), ("run_at", 1)])
+        # finished_at is only set (as a UTC date) once a job is done or failed, so the TTL skips pending jobs
+        self.collection.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_DAYS * 86400)
+
+    def enqueue(self, job):
+        self.collection.insert_one(job)
+
+    def claim(self):
+        now = datetime.now().isoformat()
+        return self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                {"status": "running", "locked_until": {"$lt": now}}
+            ]},
+            {"$set": {"status": "running", "locked_until": seconds_from_now(JOB_LEASE_SECONDS)},
+             "$inc": {"attempts": 1}},
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def complete(self, job):
+        self._release(job, {"status": "done", "finished_at": datetime.utcnow()})
+
+    def retry(self, job, error):
+        if job["attempts"] >= JOB_MAX_ATTEMPTS:
+            update = {"status": "failed", "last_error": error, "finished_at": datetime.utcnow()}
+        else:
+            update = {"status": "queued", "last_error": error, "run_at": seconds_from_now(job_backoff(job["attempts"]))}
+        self._release(job, update)
+
+    def _release(self, job, update):
+        # Only the worker still holding the lease may finish or re-queue the job: once the lease
+        # expires another worker can re-claim it, which sets a new locked_until
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": "running", "locked_until": job["locked_until"]}, {"$set": update})
+        if result.matched_count == 0:
+            print(f"❌ Job {job['type']} {job['_id']} lease lost; result of this attempt discarded")
+
+class LocalJobQueue:
+    """In-process stand-in for MongoJobQueue; jobs are lost on restart. Runs its own worker thread."""
+
+    def __init__(self, concurrency=2):
+        self.jobs = [] # heap of (run_at, sequence, job)
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.worker = None
+        self.concurrency = concurrency
+
+    def enqueue(self, job):
+        self._push(job)
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=run_worker, args=(self, self.concurrency), daemon=True)
+                self.worker.start()
+
+    def _push(self, job):
+        with self.lock:
+            self.sequence += 1
+            heapq.heappush(self.jobs, (job["run_at"], self.sequence, job))
+
+    def claim(self):
+        with self.lock:
+            if not self.jobs or self.jobs[0][0] > datetime.now().isoformat():
+                return None
+            job = heapq.heappop(self.jobs)[2]
+        job["status"] = "running"
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job):
+        job["status"] = "done"
+
+    def retry(self, job, error):
+        job["last_error"] = error
+        if job["attempts"] >= JOB_MAX_ATTEMPTS:
+            job["status"] = "failed"
+        else:
+            job.update({"status": "queued", "run_at": seconds_from_now(job_backoff(job["attempts"]))})
+            self._push(job)
+
+if JOB_QUEUE_BACKEND == "local":
+    job_queue = LocalJobQueue()
+else:
+    job_queue = MongoJobQueue(client.get_database(DEFAULT_DATABASE).jobs)
+
+def enqueue_job(job_type, payload):
+    """Queues a job for the current society. Never raises: the write that triggered it already succeeded."""
+    try:
+        job_queue.enqueue({
+            "_id": ObjectId(),
+            "type": job_type,
+            "society_id": get_society_id(),
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "run_at": datetime.now().isoformat(),
+            "created_at": datetime.now().isoformat()
+        })
+    except Exception as e:
+        print(f"❌ Enqueue {job_type} job error: {e}")
+
+def process_job(queue, job):
+    try:
+        handler = JOB_HANDLERS.get(job["type"])
+        if not handler:
+            raise ValueError(f"Unknown job type {job['type']}")
+        handler(get_tenant_db(job["society_id"]), job)
+        queue.complete(job)
+        print(f"✅ Job {job['type']} {job['_id']} done")
+    except Exception as e:
+        print(f"❌ Job {job['type']} {job['_id']} failed (attempt {job['attempts']}): {e}")
+        queue.retry(job, str(e))
+
+def run_worker(queue, concurrency, poll_interval=1.0):
+    """Claims and runs jobs forever, with at most `concurrency` in flight."""
+    slots = threading.BoundedSemaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as pool:
+        while True:
+            slots.acquire()
+            try:
+                job = queue.claim()
+            except Exception as e:
+                print(f"❌ Job claim error: {e}")
+                job = None
+            if job is None:
+                slots.release()
+                time.sleep(poll_interval)
+                continue
+            pool.submit(process_job, queue, job).add_done_callback(lambda _: slots.release())
+
+def notify_users(database, job, user_ids, message, kind, ref_id):
+    """Writes one notification per user in batches; re-running the job skips those already written."""
+    created_at = datetime.now().isoformat()
+    for i in range(0, len(user_ids), NOTIFICATION_BATCH_SIZE):
+        insert_many_ignoring_duplicates(database.notifications, [{
+            "society_id": job["society_id"],
+            "job_id": job["_id"],
+            "user_id": user_id,
+            "type": kind,
+            "message": message,
+            "ref_id": ref_id,
+            "read": False,
+            "created_at": created_at
+        } for user_id in user_ids[i:i + NOTIFICATION_BATCH_SIZE]])
+
+def resident_ids(database, society_id):
+    return [u["_id"] for u in database.users.find({"society_id": society_id, "role": "resident"}, {"_id": 1})]
+
+@job_handler("notify_alert")
+def notify_alert_job(database, job):
+    payload = job["payload"]
+    notify_users(database, job, resident_ids(database, job["society_id"]),
+                 payload["message"], "alert", payload["alert_id"])
+
+@job_handler("notify_new_poll")
+def notify_new_poll_job(database, job):
+    payload = job["payload"]
+    notify_users(database, job, resident_ids(database, job["society_id"]),
+                 f"New poll: {payload['question']}", "poll", payload["poll_id"])
+
+@job_handler("notify_complaint_status")
+def notify_complaint_status_job(database, job):
+    payload = job["payload"]
+    notify_users(database, job, [payload["user_id"]],
+                 f"Your complaint \"{payload['title']}\" is now {payload['status']}", "complaint", payload["complaint_id"])
+
+@app.cli.command("worker")
+@click.option("--concurrency", default=4, show_default=True, help="Maximum jobs running at once.")
+@click.option("--poll-interval", default=1.0, show_default=True, help="Seconds to wait when the queue is empty.")
+def worker_command(concurrency, poll_interval):
+    """Runs queued background jobs (notifications) until interrupted."""
+    if not isinstance(job_queue, MongoJobQueue):
+        raise click.ClickException("The worker needs JOB_QUEUE_BACKEND=mongo; the local queue runs in-process.")
+    click.echo(f"✅ Worker started with concurrency {concurrency}")
+    run_worker(job_queue, concurrency, poll_interval)
+
 
 # --- USER & AUTHENTICATION ROUTES ---
 
@@ -130,6 +1391,7 @@ def register():
             return jsonify({"error": "Email already exists as a user or a pending request"}), 409
 
         registration_requests_collection.insert_one({
+            "society_id": get_society_id(),
             "name": name, 
             "email": email, 
             "password": password, 
@@ -140,10 +1402,12 @@ def register():
         print(f"✅ Registration request submitted for {email}")
         return jsonify({"message": "Registration request submitted successfully. Awaiting admin approval."})
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Registration error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route("/login", methods=["POST"])
+@rate_limited("login")
 def login():
     try:
         data = request.json
@@ -152,6 +1416,8 @@ def login():
             return jsonify({"error": "Email and password are required"}), 400
 
         # MongoDB query: Find user by email. We check password in Python.
+        # Emails are unique per database, so this is not society-scoped; the
+        # returned society_id tells the client which society to send afterwards.
         user = users_collection.find_one({"email": email})
         if user and user['password'] == password:
             print(f"✅ Login successful for {email} with role {user['role']}")
@@ -162,6 +1428,7 @@ def login():
             print(f"❌ Invalid login attempt for {email}")
             return jsonify({"error": "Invalid email or password"}), 401
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Login error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -176,7 +1443,7 @@ def change_password():
         obj_id = to_object_id(user_id)
         if not obj_id: return jsonify({"error": "Invalid User ID format"}), 400
 
-        user = users_collection.find_one({"_id": obj_id})
+        user = users_collection.find_one(scoped({"_id": obj_id}))
         
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -185,12 +1452,13 @@ def change_password():
             return jsonify({"error": "Incorrect current password"}), 401
 
         # NOTE: In a real application, you should hash the password before saving
-        users_collection.update_one({"_id": obj_id}, {"$set": {"password": new_password}})
+        users_collection.update_one(scoped({"_id": obj_id}), {"$set": {"password": new_password}})
         
         print(f"✅ Password changed for user ID {user_id}")
         return jsonify({"message": "Password changed successfully"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Change password error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -201,12 +1469,13 @@ def get_registration_requests():
     try:
         # NOTE: Implement an authorization check here to ensure only 'admin' can access
         
-        requests = list(registration_requests_collection.find().sort("created_at", -1))
+        requests = list(registration_requests_collection.find(scoped()).sort("created_at", -1))
         # Convert _id to string for all documents
         requests = [prepare_document(r) for r in requests]
 
         return jsonify(requests)
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Get requests error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -222,12 +1491,13 @@ def approve_request():
         obj_id = to_object_id(request_id)
         if not obj_id: return jsonify({"error": "Invalid Request ID format"}), 400
 
-        request_doc = registration_requests_collection.find_one({"_id": obj_id})
+        request_doc = registration_requests_collection.find_one(scoped({"_id": obj_id}))
         if not request_doc:
             return jsonify({"error": "Request not found"}), 404
 
         # 1. Move user data to the main users collection
         user_data = {
+            "society_id": get_society_id(),
             "name": request_doc["name"],
             "email": request_doc["email"],
             "password": request_doc["password"],
@@ -238,12 +1508,13 @@ def approve_request():
         users_collection.insert_one(user_data)
 
         # 2. Delete the request
-        registration_requests_collection.delete_one({"_id": obj_id})
+        registration_requests_collection.delete_one(scoped({"_id": obj_id}))
 
         print(f"✅ Registration request approved for {request_doc['email']}")
         return jsonify({"message": "User approved and registered successfully"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Approve request error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -259,7 +1530,7 @@ def reject_request():
         obj_id = to_object_id(request_id)
         if not obj_id: return jsonify({"error": "Invalid Request ID format"}), 400
 
-        result = registration_requests_collection.delete_one({"_id": obj_id})
+        result = registration_requests_collection.delete_one(scoped({"_id": obj_id}))
 
         if result.deleted_count == 0:
             return jsonify({"error": "Request not found"}), 404
@@ -268,6 +1539,7 @@ def reject_request():
         return jsonify({"message": "Registration request rejected successfully"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Reject request error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -275,7 +1547,7 @@ def reject_request():
 def get_users():
     try:
         # Find all users except the 'admin@society.com' user
-        users = list(users_collection.find({"email": {"$ne": "admin@society.com"}}).sort("name", 1))
+        users = list(users_collection.find(scoped({"email": {"$ne": "admin@society.com"}})).sort("name", 1))
         
         # Prepare and remove password from each user document
         user_list = []
@@ -284,8 +1556,9 @@ def get_users():
             user_safe.pop('password', None)
             user_list.append(user_safe)
 
-        return jsonify(user_list)
+        return list_response(user_list)
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Get users error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -304,7 +1577,7 @@ def change_user_role():
         if not obj_id: return jsonify({"error": "Invalid User ID format"}), 400
 
         result = users_collection.update_one(
-            {"_id": obj_id}, 
+            scoped({"_id": obj_id}), 
             {"$set": {"role": new_role}}
         )
 
@@ -315,40 +1588,31 @@ def change_user_role():
         return jsonify({"message": f"User role updated to {new_role}"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Change role error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route("/admin/get_house_requests", methods=["GET"])
 def get_house_requests():
     try:
-        # Aggregate to join with the users collection to get the user's name and current house
-        pipeline = [
-            # Join with users collection
-            {"$lookup": {
-                "from": "users",
-                "localField": "user_id",
-                "foreignField": "_id",
-                "as": "user_info"
-            }},
-            # Unwind the user_info array (since user_id is unique, there's only one item)
-            {"$unwind": "$user_info"},
-            # Project the final desired fields
-            {"$project": {
-                "_id": {"$toString": "$_id"},
-                "user_id": {"$toString": "$user_id"},
-                "requested_house_number": 1,
-                "status": 1,
-                "created_at": 1,
-                "user_name": "$user_info.name",
-                "user_email": "$user_info.email",
-                "current_house_number": "$user_info.house_number"
-            }},
-            {"$sort": {"created_at": -1}}
-        ]
-        
-        requests = list(house_requests_collection.aggregate(pipeline))
+        # Pending requests by default (?status=approved|rejected|all for history), newest first,
+        # paged with ?before=<created_at>. User fields are stored on the request, so no join.
+        status = request.args.get("status", "pending")
+        if status not in ['pending', 'approved', 'rejected', 'all']:
+            return jsonify({"error": "Invalid status specified"}), 400
+        before, limit = page_args(request.args)
+
+        query = scoped() if status == 'all' else scoped({"status": status})
+        if before:
+            query["created_at"] = {"$lt": before}
+
+        requests = list(house_requests_collection.find(query, {"society_id": 0}).sort("created_at", -1).limit(limit))
+        for r in requests:
+            r["_id"] = str(r["_id"])
+            r["user_id"] = str(r["user_id"])
         return jsonify(requests)
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Get house requests error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -366,24 +1630,21 @@ def process_house_request():
         obj_id = to_object_id(request_id)
         if not obj_id: return jsonify({"error": "Invalid Request ID format"}), 400
 
-        # Find the request
-        request_doc = house_requests_collection.find_one({"_id": obj_id})
+        # 1. Move the request out of pending (atomically, so a double-submit cannot process it twice)
+        request_doc = house_requests_collection.find_one_and_update(
+            scoped({"_id": obj_id, "status": "pending"}),
+            {"$set": {"status": status, "processed_at": datetime.now().isoformat()}}
+        )
         if not request_doc:
-            return jsonify({"error": "Request not found"}), 404
+            return jsonify({"error": "Request not found or already processed"}), 404
         
         user_obj_id = request_doc["user_id"]
         requested_house = request_doc["requested_house_number"]
 
-        # 1. Update the request status
-        house_requests_collection.update_one(
-            {"_id": obj_id}, 
-            {"$set": {"status": status}}
-        )
-
         # 2. If approved, update the user's house number
         if status == 'approved':
             users_collection.update_one(
-                {"_id": user_obj_id},
+                scoped({"_id": user_obj_id}),
                 {"$set": {"house_number": requested_house}}
             )
             print(f"✅ House change request approved for user {user_obj_id}. New house: {requested_house}")
@@ -395,13 +1656,154 @@ def process_house_request():
         return jsonify({"message": message})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Process house request error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+# --- BULK RESIDENT IMPORT ---
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_REQUIRED_FIELDS = ("name", "email", "password", "house_number")
+
+def import_residents_csv(stream, batch_size=IMPORT_BATCH_SIZE):
+    """Streams a residents CSV into the users collection in batches.
+
+    Each batch is checked against users and registration_requests with a single
+    $in query and written with one unordered insert_many. Returns the number of
+    inserted users, a list of per-row errors (row numbers are 1-based and count
+    the header line) and, if the file could not be read to the end (not UTF-8,
+    malformed CSV), why the import stopped. Rows before that point are imported."""
+    reader = csv.DictReader(stream)
+    try:
+        fieldnames = reader.fieldnames or []
+    except (UnicodeDecodeError, csv.Error) as e:
+        return 0, [{"row": 1, "error": unreadable_csv_message(e)}], unreadable_csv_message(e)
+    missing_columns = [f for f in IMPORT_REQUIRED_FIELDS if f not in fieldnames]
+    if missing_columns:
+        return 0, [{"row": 1, "error": f"Missing columns: {', '.join(missing_columns)}"}], None
+
+    inserted = 0
+    errors = []
+    seen_emails = set()
+    batch = []
+
+    def flush(batch):
+        emails = [doc["email"] for _, doc in batch]
+        existing = {u["email"] for u in users_collection.find({"email": {"$in": emails}}, {"email": 1})}
+        existing.update(r["email"] for r in registration_requests_collection.find({"email": {"$in": emails}}, {"email": 1}))
+
+        rows, docs = [], []
+        for row_number, doc in batch:
+            if doc["email"] in existing:
+                errors.append({"row": row_number, "error": "Email already exists as a user or a pending request"})
+            else:
+                rows.append(row_number)
+                docs.append(doc)
+        if not docs:
+            return 0
+
+        try:
+            return len(users_collection.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as bwe:
+            # Rows can still collide with a concurrent /register or import
+            for write_error in bwe.details.get("writeErrors", []):
+                message = "Duplicate email" if write_error.get("code") == 11000 else write_error.get("errmsg")
+                errors.append({"row": rows[write_error["index"]], "error": message})
+            return bwe.details.get("nInserted", 0)
+
+    society_id = get_society_id()
+    created_at = datetime.now().isoformat()
+    stopped = None
+    rows = enumerate(reader, start=2)
+    while True:
+        try:
+            row_number, row = next(rows)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as e:
+            stopped = unreadable_csv_message(e)
+            errors.append({"row": reader.line_num + 1, "error": stopped})
+            break
+        row = {k: (v or "").strip() for k, v in row.items() if k}
+        if not all(row.get(f) for f in IMPORT_REQUIRED_FIELDS):
+            errors.append({"row": row_number, "error": "Missing required fields"})
+            continue
+        email = row["email"]
+        if "@" not in email:
+            errors.append({"row": row_number, "error": "Invalid email"})
+            continue
+        if email in seen_emails:
+            errors.append({"row": row_number, "error": "Duplicate email in file"})
+            continue
+        seen_emails.add(email)
+
+        batch.append((row_number, {
+            "society_id": society_id,
+            "name": row["name"],
+            "email": email,
+            "password": row["password"], # NOTE: Hash this password in a real app!
+            "role": "resident",
+            "house_number": row["house_number"],
+            "created_at": created_at
+        }))
+        if len(batch) >= batch_size:
+            inserted += flush(batch)
+            batch = []
+
+    if batch:
+        inserted += flush(batch)
+
+    errors.sort(key=lambda e: e["row"])
+    return inserted, errors, stopped
+
+def unreadable_csv_message(error):
+    if isinstance(error, UnicodeDecodeError):
+        return "File is not UTF-8 encoded; import stopped here"
+    return f"Malformed CSV ({error}); import stopped here"
+
+@app.route("/admin/import_residents", methods=["POST"])
+def import_residents():
+    try:
+        if request.form.get("user_role") != 'admin':
+            return jsonify({"error": "Unauthorized"}), 403
+        if 'file' not in request.files or request.files['file'].filename == '':
+            return jsonify({"error": "CSV file is required"}), 400
+
+        stream = io.TextIOWrapper(request.files['file'].stream, encoding="utf-8-sig", newline="")
+        inserted, errors, stopped = import_residents_csv(stream)
+        if stopped:
+            print(f"❌ Bulk import stopped after {inserted} residents: {stopped}")
+            return jsonify({"error": stopped, "inserted": inserted, "errors": errors}), 400
+
+        print(f"✅ Bulk import finished: {inserted} residents added, {len(errors)} rows rejected.")
+        return jsonify({"message": "Import finished", "inserted": inserted, "errors": errors})
+
+    except Exception as e:
+        record_database_error(e)
+        print(f"❌ Import residents error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.cli.command("import-residents")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=IMPORT_BATCH_SIZE, show_default=True)
+@click.option("--society", default=DEFAULT_SOCIETY_ID, show_default=True)
+def import_residents_command(csv_path, batch_size, society):
+    """Bulk-import residents from a CSV (name,email,password,house_number)."""
+    g.society_id = society
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        inserted, errors, stopped = import_residents_csv(f, batch_size=batch_size)
+    for error in errors:
+        click.echo(f"Row {error['row']}: {error['error']}", err=True)
+    if stopped:
+        raise click.ClickException(f"{stopped} ({inserted} residents imported before it)")
+    click.echo(f"✅ {inserted} residents imported, {len(errors)} rows rejected.")
+
 
 # --- COMPLAINTS ROUTES ---
 
 @app.route("/submit_complaint", methods=["POST"])
+@rate_limited("submit_complaint")
 def submit_complaint():
     try:
         user_id = to_object_id(request.form.get("user_id"))
@@ -425,10 +1827,12 @@ def submit_complaint():
             else:
                 return jsonify({"error": "Invalid file type"}), 400
 
-        user = users_collection.find_one({"_id": user_id})
+        user = users_collection.find_one(scoped({"_id": user_id}))
         if not user: return jsonify({"error": "User not found"}), 404
 
         complaint_doc = {
+            "society_id": get_society_id(),
+            **sync_stamp(),
             "user_id": user_id,
             "title": title,
             "description": description,
@@ -445,6 +1849,7 @@ def submit_complaint():
         return jsonify({"message": "Complaint submitted successfully", "id": str(result.inserted_id)}), 201
     
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Submit complaint error: {e}")
         traceback.print_exc()
         return jsonify({"error": "Internal server error"}), 500
@@ -452,62 +1857,27 @@ def submit_complaint():
 @app.route("/get_complaints", methods=["GET"])
 def get_complaints():
     try:
-        user_role = request.args.get("user_role")
-        user_id_str = request.args.get("user_id")
-        
-        match_query = {}
-        if user_role == 'resident' and user_id_str:
-            user_id = to_object_id(user_id_str)
-            if user_id:
-                match_query["user_id"] = user_id
-        
-        # Aggregation Pipeline to join complaints with user names and like counts
-        pipeline = [
-            # 1. Filter complaints based on the user_role (if resident)
-            {"$match": match_query},
-            
-            # 2. Join with users collection to get the name of the submitter
-            {"$lookup": {
-                "from": "users",
-                "localField": "user_id",
-                "foreignField": "_id",
-                "as": "user_info"
-            }},
-            # 3. Join with likes collection to calculate the like count
-            {"$lookup": {
-                "from": "complaint_likes",
-                "localField": "_id",
-                "foreignField": "complaint_id",
-                "as": "likes"
-            }},
-            # 4. Project the final fields
-            {"$project": {
-                "_id": {"$toString": "$_id"}, # Convert ObjectId to string
-                "title": 1,
-                "description": 1,
-                "category": 1,
-                "status": 1,
-                "image_url": 1,
-                "created_at": 1,
-                "last_updated": 1,
-                "user_id": {"$toString": "$user_id"},
-                "user_name": {"$arrayElemAt": ["$user_info.name", 0]}, # Get the name from the joined array
-                "like_count": {"$size": "$likes"}, # Count the number of likes
-                "liking_users": {"$map": { # Get a list of user_ids that liked this complaint
-                    "input": "$likes",
-                    "as": "like",
-                    "in": {"$toString": "$$like.user_id"}
-                }}
-            }},
-            # 5. Sort by last_updated (newest first)
-            {"$sort": {"last_updated": -1}}
-        ]
-
-        complaints = list(complaints_collection.aggregate(pipeline))
+        match_query = complaints_match_query(scoped(), request.args)
+        if wants_archived(request.args):
+            database = get_tenant_db()
+            before, limit = archive_page_args(request.args)
+            archived_query = archived_complaints_query(database, match_query, before, limit)
+            if before:
+                # Later archive pages: the live complaints were already sent with the first page
+                complaints = archived_query()
+            else:
+                complaints, archived = run_concurrently(
+                    lambda: list(database.complaints.aggregate(complaints_pipeline(match_query))),
+                    archived_query
+                )
+                complaints = sorted(complaints + archived, key=lambda c: c.get("last_updated", ""), reverse=True)
+        else:
+            complaints = list(complaints_collection.aggregate(complaints_pipeline(match_query)))
 
-        return jsonify(complaints)
+        return list_response(complaints)
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Get complaints error: {e}")
         traceback.print_exc()
         return jsonify({"error": "Internal server error"}), 500
@@ -526,18 +1896,22 @@ def update_complaint_status():
         obj_id = to_object_id(complaint_id)
         if not obj_id: return jsonify({"error": "Invalid Complaint ID format"}), 400
         
-        result = complaints_collection.update_one(
-            {"_id": obj_id},
-            {"$set": {"status": status, "last_updated": datetime.now().isoformat()}}
+        complaint = complaints_collection.find_one_and_update(
+            scoped({"_id": obj_id}),
+            {"$set": {"status": status, "last_updated": datetime.now().isoformat(), **sync_stamp()}},
+            projection={"user_id": 1, "title": 1}
         )
 
-        if result.matched_count == 0:
+        if not complaint:
             return jsonify({"error": "Complaint not found"}), 404
 
+        enqueue_job("notify_complaint_status", {
+            "complaint_id": obj_id, "user_id": complaint["user_id"], "title": complaint["title"], "status": status})
         print(f"✅ Complaint ID {complaint_id} status updated to {status} by {user_role}.")
         return jsonify({"message": f"Complaint status updated to {status}"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Update status error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -553,23 +1927,28 @@ def delete_complaint():
         obj_id = to_object_id(complaint_id)
         if not obj_id: return jsonify({"error": "Invalid Complaint ID format"}), 400
 
-        # 1. Delete associated likes
-        likes_collection.delete_many({"complaint_id": obj_id})
-
-        # 2. Delete the complaint
-        result = complaints_collection.delete_one({"_id": obj_id})
+        # 1. Delete the complaint (falling back to the archive)
+        result = complaints_collection.delete_one(scoped({"_id": obj_id}))
+        if result.deleted_count == 0:
+            result = get_tenant_db().complaints_archive.delete_one(scoped({"_id": obj_id}))
         
         if result.deleted_count == 0:
             return jsonify({"error": "Complaint not found"}), 404
 
+        # 2. Delete associated likes
+        likes_collection.delete_many({"complaint_id": obj_id})
+        record_tombstone("complaint", obj_id)
+
         print(f"✅ Complaint ID {complaint_id} and associated likes deleted by admin.")
         return jsonify({"message": "Complaint deleted successfully"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Delete complaint error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route("/like_complaint", methods=["POST"])
+@rate_limited("like_complaint")
 def like_complaint():
     try:
         data = request.json
@@ -585,9 +1964,9 @@ def like_complaint():
              return jsonify({"error": "Invalid ID format"}), 400
 
         # Check if the complaint and user exist (optional but good for integrity)
-        if not complaints_collection.find_one({"_id": complaint_obj_id}):
+        if not complaints_collection.find_one(scoped({"_id": complaint_obj_id})):
             return jsonify({"error": "Complaint not found"}), 404
-        if not users_collection.find_one({"_id": user_obj_id}):
+        if not users_collection.find_one(scoped({"_id": user_obj_id})):
             return jsonify({"error": "User not found"}), 404
 
         # Check if the user already liked it
@@ -599,19 +1978,24 @@ def like_complaint():
         if existing_like:
             # Unlike the complaint
             likes_collection.delete_one({"_id": existing_like["_id"]})
-            print(f"✅ User {user_id_str} unliked complaint {complaint_id_str}")
-            return jsonify({"message": "Unliked", "action": "unliked"})
+            action = "unliked"
         else:
             # Like the complaint
             likes_collection.insert_one({
+                "society_id": get_society_id(),
                 "complaint_id": complaint_obj_id, 
                 "user_id": user_obj_id, 
                 "created_at": datetime.now().isoformat()
             })
-            print(f"✅ User {user_id_str} liked complaint {complaint_id_str}")
-            return jsonify({"message": "Liked", "action": "liked"})
+            action = "liked"
+
+        # The like count is part of the complaint as clients see it, so the complaint changes too
+        complaints_collection.update_one({"_id": complaint_obj_id}, {"$set": sync_stamp()})
+        print(f"✅ User {user_id_str} {action} complaint {complaint_id_str}")
+        return jsonify({"message": action.capitalize(), "action": action})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Like/Unlike error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -635,6 +2019,8 @@ def create_poll():
             return jsonify({"error": "Poll requires at least two options"}), 400
         
         poll_doc = {
+            "society_id": get_society_id(),
+            **sync_stamp(),
             "user_id": user_id,
             "question": question,
             "options": options_list,
@@ -643,84 +2029,48 @@ def create_poll():
         }
         
         result = polls_collection.insert_one(poll_doc)
+        enqueue_job("notify_new_poll", {"poll_id": result.inserted_id, "question": question})
         print(f"✅ New poll created with ID: {result.inserted_id}")
 
         return jsonify({"message": "Poll created successfully", "id": str(result.inserted_id)}), 201
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Create poll error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route("/get_polls", methods=["GET"])
 def get_polls():
     try:
-        # Get all polls, sort by newest first
-        polls = list(polls_collection.find().sort("created_at", -1))
-        
-        # Convert _id to string for all documents
-        polls = [prepare_document(p) for p in polls]
-        
-        # Get vote counts for all polls
-        poll_ids = [p["_id"] for p in polls]
-        poll_obj_ids = [to_object_id(id_str) for id_str in poll_ids]
-        
-        # Aggregate to get vote counts per poll and option
-        vote_counts_pipeline = [
-            {"$match": {"poll_id": {"$in": poll_obj_ids}}},
-            {"$group": {
-                "_id": {"poll_id": "$poll_id", "option_index": "$option_index"},
-                "count": {"$sum": 1}
-            }},
-            {"$project": {
-                "poll_id": {"$toString": "$_id.poll_id"},
-                "option_index": "$_id.option_index",
-                "count": 1,
-                "_id": 0
-            }}
-        ]
-        vote_counts = list(poll_votes_collection.aggregate(vote_counts_pipeline))
-        
-        # Restructure votes into a dictionary for easy lookup
-        votes_dict = {}
-        for vc in vote_counts:
-            poll_id = vc["poll_id"]
-            if poll_id not in votes_dict:
-                votes_dict[poll_id] = {}
-            votes_dict[poll_id][vc["option_index"]] = vc["count"]
-
-        # Finalize poll data with vote counts
-        for poll in polls:
-            poll_id = poll["_id"]
-            total_votes = 0
-            poll['results'] = []
-            
-            for i, option in enumerate(poll['options']):
-                count = votes_dict.get(poll_id, {}).get(i, 0)
-                total_votes += count
-                poll['results'].append({
-                    "option": option,
-                    "count": count
-                })
-            poll['total_votes'] = total_votes
-
         # Determine user's vote if user_id is provided in args (for resident view)
         user_id_str = request.args.get("user_id")
         user_obj_id = to_object_id(user_id_str) if user_id_str else None
-        
-        if user_obj_id:
-            user_votes = list(poll_votes_collection.find({"user_id": user_obj_id}))
-            user_votes_map = {str(v["poll_id"]): v["option_index"] for v in user_votes}
-            
-            for poll in polls:
-                poll['user_voted_index'] = user_votes_map.get(poll["_id"], -1)
 
-        return jsonify(polls)
+        # Polls (newest first), vote counts and the user's votes are fetched concurrently
+        database, scope = get_tenant_db(), scoped()
+        if wants_archived(request.args):
+            before, limit = archive_page_args(request.args)
+            archived_query = archived_polls_query(database, scope, user_obj_id, before, limit)
+            if before:
+                # Later archive pages: the live polls were already sent with the first page
+                return list_response(archived_query())
+            queries = poll_queries(database, scope, user_obj_id) + (archived_query,)
+        else:
+            queries = poll_queries(database, scope, user_obj_id)
+        polls, vote_counts, user_votes, *archived = run_concurrently(*queries)
+        polls = assemble_polls(polls, vote_counts, user_votes)
+        if archived:
+            polls = sorted(polls + archived[0], key=lambda p: p.get("created_at", ""), reverse=True)
+
+        return list_response(polls)
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Get polls error: {e}")
         traceback.print_exc()
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route("/vote_poll", methods=["POST"])
+@rate_limited("vote_poll")
 def vote_poll():
     try:
         data = request.json
@@ -735,31 +2085,33 @@ def vote_poll():
         if not poll_obj_id or not user_obj_id:
              return jsonify({"error": "Invalid ID format"}), 400
         
-        poll = polls_collection.find_one({"_id": poll_obj_id, "is_active": True})
+        poll = polls_collection.find_one(scoped({"_id": poll_obj_id, "is_active": True}))
         if not poll:
             return jsonify({"error": "Poll not found or is closed"}), 404
         
         if option_index < 0 or option_index >= len(poll['options']):
             return jsonify({"error": "Invalid option index"}), 400
 
-        # Check if user already voted (and delete old vote to allow changing vote)
-        poll_votes_collection.delete_one({
-            "poll_id": poll_obj_id, 
-            "user_id": user_obj_id
-        })
-
-        # Insert the new vote
-        poll_votes_collection.insert_one({
-            "poll_id": poll_obj_id,
-            "user_id": user_obj_id,
-            "option_index": option_index,
-            "voted_at": datetime.now().isoformat()
-        })
+        # Record the vote, replacing any earlier vote so users can change their choice.
+        # Updating in place keeps the vote's _id stable for synced clients.
+        poll_votes_collection.update_one(
+            {"poll_id": poll_obj_id, "user_id": user_obj_id},
+            {"$set": {
+                "society_id": get_society_id(),
+                "option_index": option_index,
+                "voted_at": datetime.now().isoformat(),
+                **sync_stamp()
+            }},
+            upsert=True
+        )
+        # The poll's results changed as well
+        polls_collection.update_one({"_id": poll_obj_id}, {"$set": sync_stamp()})
         
         print(f"✅ User {user_id_str} voted on poll {poll_id_str} with option {option_index}")
         return jsonify({"message": "Vote recorded successfully", "new_vote_index": option_index})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Vote poll error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -776,8 +2128,8 @@ def close_poll():
         if not obj_id: return jsonify({"error": "Invalid Poll ID format"}), 400
 
         result = polls_collection.update_one(
-            {"_id": obj_id}, 
-            {"$set": {"is_active": False}}
+            scoped({"_id": obj_id}), 
+            {"$set": {"is_active": False, "closed_at": datetime.now().isoformat(), **sync_stamp()}}
         )
 
         if result.matched_count == 0:
@@ -787,6 +2139,7 @@ def close_poll():
         return jsonify({"message": "Poll closed successfully"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Close poll error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -802,19 +2155,23 @@ def delete_poll():
         obj_id = to_object_id(poll_id)
         if not obj_id: return jsonify({"error": "Invalid Poll ID format"}), 400
 
-        # 1. Delete associated votes
-        poll_votes_collection.delete_many({"poll_id": obj_id})
-        
-        # 2. Delete the poll
-        result = polls_collection.delete_one({"_id": obj_id})
+        # 1. Delete the poll (falling back to the archive)
+        result = polls_collection.delete_one(scoped({"_id": obj_id}))
+        if result.deleted_count == 0:
+            result = get_tenant_db().polls_archive.delete_one(scoped({"_id": obj_id}))
         
         if result.deleted_count == 0:
             return jsonify({"error": "Poll not found"}), 404
 
+        # 2. Delete associated votes
+        poll_votes_collection.delete_many({"poll_id": obj_id})
+        record_tombstone("poll", obj_id)
+
         print(f"✅ Poll ID {poll_id} and associated votes deleted by admin.")
         return jsonify({"message": "Poll deleted successfully"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Delete poll error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -826,56 +2183,51 @@ def create_alert():
     try:
         data = request.json
         message, user_id_str, user_role = data.get("message"), data.get("user_id"), data.get("user_role")
+        expires_in_hours = data.get("expires_in_hours")
 
         if user_role not in ['admin', 'worker']:
             return jsonify({"error": "Unauthorized"}), 403
         if not all([message, user_id_str]):
             return jsonify({"error": "Missing required fields"}), 400
+        if expires_in_hours is not None and (not isinstance(expires_in_hours, (int, float)) or expires_in_hours <= 0):
+            return jsonify({"error": "expires_in_hours must be a positive number"}), 400
         
         user_id = to_object_id(user_id_str)
         if not user_id: return jsonify({"error": "Invalid User ID format"}), 400
 
+        creator = users_collection.find_one(scoped({"_id": user_id}), {"name": 1})
+        if not creator: return jsonify({"error": "User not found"}), 404
+
         alert_doc = {
+            "society_id": get_society_id(),
+            **sync_stamp(),
             "message": message,
             "created_by": user_id,
+            "created_by_name": creator["name"],
             "created_at": datetime.now().isoformat()
         }
+        if expires_in_hours:
+            # A BSON date (UTC) so the TTL index can remove the alert once it expires
+            alert_doc["expires_at"] = datetime.utcnow() + timedelta(hours=expires_in_hours)
         
         result = alerts_collection.insert_one(alert_doc)
+        enqueue_job("notify_alert", {"alert_id": result.inserted_id, "message": message})
         print(f"✅ New alert created with ID: {result.inserted_id}")
 
         return jsonify({"message": "Alert created successfully", "id": str(result.inserted_id)}), 201
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Create alert error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route("/get_alerts", methods=["GET"])
 def get_alerts():
     try:
-        # Aggregate to join with the users collection to get the created_by name
-        alerts_pipeline = [
-            # Join with users collection
-            {"$lookup": {
-                "from": "users",
-                "localField": "created_by",
-                "foreignField": "_id",
-                "as": "creator"
-            }},
-            # Unwind the creator array (since created_by is unique, there's only one item)
-            {"$unwind": "$creator"},
-            # Project the final desired fields
-            {"$project": {
-                "_id": {"$toString": "$_id"},
-                "message": 1,
-                "created_at": 1,
-                "created_by_name": "$creator.name"
-            }},
-            {"$sort": {"created_at": -1}}
-        ]
-        
-        alerts = list(alerts_collection.aggregate(alerts_pipeline))
-        return jsonify(alerts)
+        before, limit = alerts_page_args(request.args)
+        alerts = alerts_query(get_tenant_db(), scoped(), before, limit)
+        return list_response(alerts)
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Get alerts error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
@@ -892,18 +2244,194 @@ def delete_alert():
         obj_id = to_object_id(alert_id)
         if not obj_id: return jsonify({"error": "Invalid Alert ID format"}), 400
         
-        result = alerts_collection.delete_one({"_id": obj_id})
+        result = alerts_collection.delete_one(scoped({"_id": obj_id}))
         
         if result.deleted_count == 0:
             return jsonify({"error": "Alert not found"}), 404
+        record_tombstone("alert", obj_id)
 
         print(f"✅ Alert ID {alert_id} deleted by admin.")
         return jsonify({"message": "Alert deleted successfully"})
 
     except Exception as e:
+        record_database_error(e)
         print(f"❌ Delete alert error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+# --- NOTIFICATIONS ---
+
+@app.route("/get_notifications", methods=["GET"])
+def get_notifications():
+    try:
+        user_obj_id = to_object_id(request.args.get("user_id"))
+        if not user_obj_id: return jsonify({"error": "Invalid User ID format"}), 400
+
+        notifications = list(get_tenant_db().notifications.find(
+            scoped({"user_id": user_obj_id}), {"society_id": 0, "job_id": 0}
+        ).sort("created_at", -1).limit(50))
+        for notification in notifications:
+            notification["_id"] = str(notification["_id"])
+            notification["user_id"] = str(notification["user_id"])
+            notification["ref_id"] = str(notification["ref_id"])
+        return list_response(notifications)
+    except Exception as e:
+        record_database_error(e)
+        print(f"❌ Get notifications error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+# --- CLIENT SYNC ---
+# Every write to complaints, polls, votes and alerts stamps the document with
+# sync_seq, from a per-society counter, and sync_at, the database time at which
+# that number was taken. Deletes leave a tombstone stamped the same way.
+# /sync?since=<token> returns only what changed after the token, so a client
+# with a local cache applies small deltas instead of refetching every list.
+# A number is taken before its write lands, so a slow write can become visible
+# after the token covering its number was issued. Writes are bounded by
+# MONGO_TIMEOUT_MS, so each sync also re-sends everything stamped within
+# SYNC_OVERLAP_SECONDS before the token's own stamp; clients apply changes by
+# id, so repeats are harmless. Expired alerts are removed by a TTL index without
+# a tombstone: clients drop cached alerts once expires_at passes (server_time in
+# the response gives them the server's clock). Tombstones are kept for
+# TOMBSTONE_RETENTION_DAYS; a token older than that gets a full snapshot instead,
+# since deletions it missed may no longer be on record.
+# (With MONGO_TIMEOUT_MS=0 writes are unbounded and the 60 seconds is only a margin.)
+SYNC_OVERLAP_SECONDS = max(60, 2 * MONGO_TIMEOUT_MS / 1000)
+SYNC_TOKEN_PATTERN = re.compile(r"^(\d+)-(\d+)$") # <sync_seq>-<sync_at in epoch milliseconds>
+EPOCH = datetime(1970, 1, 1)
+
+def sync_stamp(database=None, society_id=None, count=1):
+    """Reserves `count` sync numbers for the (current) society; returns the highest as
+    {"sync_seq", "sync_at"}, ready to merge into a document or $set."""
+    counter = (database if database is not None else get_tenant_db()).counters.find_one_and_update(
+        {"_id": f"sync_seq:{society_id or get_society_id()}"},
+        [{"$set": {"seq": {"$add": [{"$ifNull": ["$seq", 0]}, count]}, "at": "$$NOW"}}],
+        upsert=True, return_document=ReturnDocument.AFTER)
+    return {"sync_seq": counter["seq"], "sync_at": counter["at"]}
+
+def current_sync_token(database, society_id):
+    counter = database.counters.find_one({"_id": f"sync_seq:{society_id}"})
+    if not counter:
+        return "0"
+    return f"{counter['seq']}-{int((counter['at'] - EPOCH).total_seconds() * 1000)}"
+
+def record_tombstones(database, kind, docs, reason="deleted"):
+    """Leaves tombstones so synced clients drop these documents (deleted or moved to the archive)."""
+    by_society = {}
+    for doc in docs:
+        by_society.setdefault(doc.get("society_id", DEFAULT_SOCIETY_ID), []).append(doc)
+    deleted_at = datetime.now().isoformat()
+    tombstones = []
+    for society_id, society_docs in by_society.items():
+        stamp = sync_stamp(database, society_id, len(society_docs))
+        first_seq = stamp["sync_seq"] - len(society_docs) + 1
+        tombstones += [{
+            "society_id": society_id,
+            "kind": kind,
+            "doc_id": str(doc["_id"]),
+            "reason": reason,
+            "sync_seq": first_seq + i,
+            "sync_at": stamp["sync_at"],
+            "deleted_at": deleted_at
+        } for i, doc in enumerate(society_docs)]
+    if tombstones:
+        database.tombstones.insert_many(tombstones)
+
+def record_tombstone(kind, doc_id):
+    record_tombstones(get_tenant_db(), kind, [{"_id": doc_id, "society_id": get_society_id()}])
+
+@app.route("/sync", methods=["GET"])
+def sync():
+    """Changes since ?since=<token> (omit it, or pass 0, for a full snapshot), plus the next token."""
+    try:
+        since_str = request.args.get("since", "0")
+        token_match = SYNC_TOKEN_PATTERN.match(since_str)
+        if since_str != "0" and not token_match:
+            return jsonify({"error": "Invalid sync token"}), 400
+        since = int(token_match.group(1)) if token_match else 0
+        token_at = EPOCH + timedelta(milliseconds=int(token_match.group(2))) if token_match else None
+        # The oldest tombstone this sync reads must still be within retention
+        if token_at and token_at - timedelta(seconds=SYNC_OVERLAP_SECONDS) < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            since = 0
+
+        database, scope = get_tenant_db(), scoped()
+        user_obj_id = to_object_id(request.args.get("user_id")) if request.args.get("user_id") else None
+        # Read the counter first: anything stamped later is picked up by the next sync
+        token = current_sync_token(database, get_society_id())
+
+        def changed(query):
+            # A full snapshot also covers documents written before sync_seq existed
+            if since == 0:
+                return query
+            overlap_from = token_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            return {**query, "$or": [{"sync_seq": {"$gt": since}}, {"sync_at": {"$gt": overlap_from}}]}
+
+        complaint_match = changed(complaints_match_query(scoped(), request.args))
+        complaints, polls, votes, alerts, tombstones = run_concurrently(
+            lambda: list(database.complaints.aggregate(complaints_pipeline(complaint_match))),
+            lambda: list(database.polls.find(changed(scope)).sort("created_at", -1)),
+            lambda: list(database.poll_votes.find(changed({**scope, "user_id": user_obj_id}),
+                                                  {"poll_id": 1, "option_index": 1, "voted_at": 1})) if user_obj_id else [],
+            lambda: [prepare_alert(a) for a in database.alerts.find(changed(alerts_filter(scope)), ALERT_PROJECTION)],
+            lambda: list(database.tombstones.find(changed(scope), {"_id": 0, "kind": 1, "doc_id": 1, "reason": 1})) if since else []
+        )
+
+        # Vote counts only for the polls that changed
+        vote_counts = list(database.poll_votes.aggregate(
+            poll_vote_counts_pipeline({**scope, "poll_id": {"$in": [p["_id"] for p in polls]}}))) if polls else []
+        polls = assemble_polls(polls, vote_counts, votes if user_obj_id else None)
+        for vote in votes:
+            vote["_id"] = str(vote["_id"])
+            vote["poll_id"] = str(vote["poll_id"])
+
+        encode = to_columnar if wants_compact(request.args) else list
+        return jsonify({
+            "token": token,
+            "full": since == 0,
+            "server_time": datetime.utcnow().isoformat() + "Z",
+            "complaints": encode(complaints),
+            "polls": encode(polls),
+            "votes": encode(votes),
+            "alerts": encode(alerts),
+            "deleted": tombstones
+        })
+
+    except Exception as e:
+        record_database_error(e)
+        print(f"❌ Sync error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error"}), 500
+
+# --- DASHBOARD BOOTSTRAP ---
+
+@app.route("/dashboard", methods=["GET"])
+def get_dashboard():
+    """Complaints, polls and alerts in one payload, with all five queries run concurrently."""
+    try:
+        database, scope = get_tenant_db(), scoped()
+        match_query = complaints_match_query(scoped(), request.args)
+        user_id_str = request.args.get("user_id")
+        user_obj_id = to_object_id(user_id_str) if user_id_str else None
+
+        complaints, polls, vote_counts, user_votes, alerts = run_concurrently(
+            lambda: list(database.complaints.aggregate(complaints_pipeline(match_query))),
+            *poll_queries(database, scope, user_obj_id),
+            lambda: alerts_query(database, scope)
+        )
+        polls = assemble_polls(polls, vote_counts, user_votes)
+
+        encode = to_columnar if wants_compact(request.args) else list
+        return jsonify({
+            "complaints": encode(complaints),
+            "polls": encode(polls),
+            "alerts": encode(alerts)
+        })
+
+    except Exception as e:
+        record_database_error(e)
+        print(f"❌ Get dashboard error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error"}), 500
+
 # --- HOUSE CHANGE ROUTES (Resident) ---
 
 @app.route("/request_house_change", methods=["POST"])
@@ -918,30 +2446,33 @@ def request_house_change():
         user_obj_id = to_object_id(user_id_str)
         if not user_obj_id: return jsonify({"error": "Invalid User ID format"}), 400
 
-        # Check if user already has a pending request
-        existing_request = house_requests_collection.find_one({
-            "user_id": user_obj_id, 
-            "status": "pending"
-        })
-        if existing_request:
-            return jsonify({"error": "You already have a pending house change request."}), 409
-
         # Check if the requested house number is the user's current house number
-        user = users_collection.find_one({"_id": user_obj_id})
-        if user and user.get('house_number') == new_house_number:
+        user = users_collection.find_one(scoped({"_id": user_obj_id}), {"name": 1, "email": 1, "house_number": 1})
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        if user.get('house_number') == new_house_number:
             return jsonify({"error": "The new house number is the same as your current one."}), 400
 
-        house_requests_collection.insert_one({
-            "user_id": user_obj_id,
-            "requested_house_number": new_house_number,
-            "status": "pending",
-            "created_at": datetime.now().isoformat()
-        })
+        # The partial unique index on pending requests rejects a second pending request per user
+        try:
+            house_requests_collection.insert_one({
+                "society_id": get_society_id(),
+                "user_id": user_obj_id,
+                "user_name": user["name"],
+                "user_email": user["email"],
+                "current_house_number": user.get("house_number"),
+                "requested_house_number": new_house_number,
+                "status": "pending",
+                "created_at": datetime.now().isoformat()
+            })
+        except DuplicateKeyError:
+            return jsonify({"error": "You already have a pending house change request."}), 409
         
         print(f"✅ House change request submitted by user {user_id_str} for house {new_house_number}")
         return jsonify({"message": "House change request submitted successfully. Awaiting admin approval."})
     
     except Exception as e:
+        record_database_error(e)
         print(f"❌ House change request error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
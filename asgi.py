@@ -0,0 +1,177 @@
+"""Async serving mode.
+
+Run with an ASGI server, e.g. `uvicorn asgi:application --workers 2`.
+
+The read-heavy routes below are served natively async (Quart + PyMongo's
+AsyncMongoClient), so a request waiting on MongoDB no longer holds a worker
+thread and independent queries run concurrently with asyncio.gather. Every
+other route is handed to the regular Flask app in app.py.
+"""
+import asyncio
+import traceback
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from pymongo import AsyncMongoClient
+from quart import Quart, request, jsonify
+
+from app import (
+    app as flask_app,
+    MONGO_URI, DEFAULT_DATABASE, TENANT_DATABASES, requested_society_id, list_payload,
+    to_object_id, compress_body, complaints_match_query, complaints_pipeline, poll_vote_counts_pipeline, assemble_polls,
+    wants_archived, alerts_filter, alerts_page_args, prepare_alert, ALERT_PROJECTION,
+    MONGO_TIMEOUT_MS, pool_stats, query_stats, circuit_breaker, record_database_error, CIRCUIT_OPEN_ERROR,
+    STALE_CACHE_ROUTES, stale_cache_key, stale_response_body, remember_stale_response,
+)
+
+async_app = Quart(__name__)
+async_client = None
+
+# Paths served by async_app; everything else goes to the Flask app. So do requests with
+# ?include_archived=1, since the archive reads only exist on the sync side.
+ASYNC_ROUTES = {"/get_complaints", "/get_polls", "/get_alerts"}
+
+
+@async_app.before_serving
+async def connect():
+    # The async client must be created on the server's event loop
+    global async_client
+    # Same listeners as the sync client: /health reports both pools and either client's failures trip the breaker
+    async_client = AsyncMongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, timeoutMS=MONGO_TIMEOUT_MS,
+                                    event_listeners=[pool_stats, query_stats])
+    print("✅ Async MongoDB client ready")
+
+@async_app.after_serving
+async def disconnect():
+    await async_client.close()
+
+@async_app.before_request
+async def check_circuit():
+    # Mirrors app.check_circuit: fail fast while the breaker is open, serving the last good response if any
+    if circuit_breaker.allow():
+        return None
+    if request.method == "GET" and request.path in STALE_CACHE_ROUTES:
+        body = stale_response_body(stale_cache_key(request.headers, request.full_path))
+        if body is not None:
+            return async_app.response_class(body, mimetype="application/json", headers={"X-Served-Stale": "1"})
+    response = jsonify(CIRCUIT_OPEN_ERROR)
+    response.headers["Retry-After"] = str(circuit_breaker.retry_after())
+    return response, 503
+
+@async_app.after_request
+async def add_cors_headers(response):
+    # Mirrors flask_cors' default CORS(app) behaviour for the async routes
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    if request.method == "OPTIONS":
+        response.headers["Access-Control-Allow-Headers"] = request.headers.get("Access-Control-Request-Headers", "*")
+    return response
+
+@async_app.after_request
+async def compress_response(response):
+    if response.mimetype != "application/json" or "Content-Encoding" in response.headers:
+        return response
+    body, encoding = compress_body(await response.get_data(), request.headers.get("Accept-Encoding", ""))
+    response.headers.add("Vary", "Accept-Encoding")
+    if encoding:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+@async_app.after_request
+async def remember_good_response(response):
+    # Registered after compress_response, so it runs first and stores the uncompressed body
+    if (request.method == "GET" and request.path in STALE_CACHE_ROUTES and response.status_code == 200
+            and "X-Served-Stale" not in response.headers):
+        remember_stale_response(stale_cache_key(request.headers, request.full_path), await response.get_data())
+    return response
+
+
+def get_society_id():
+    return requested_society_id(request.headers, request.args)
+
+def get_tenant_db(society_id):
+    return async_client.get_database(TENANT_DATABASES.get(society_id, DEFAULT_DATABASE))
+
+def list_response(rows):
+    return jsonify(list_payload(rows, request.args))
+
+
+@async_app.route("/get_complaints", methods=["GET"])
+async def get_complaints():
+    try:
+        society_id = get_society_id()
+        if not society_id: return jsonify({"error": "Invalid society ID"}), 400
+
+        match_query = complaints_match_query({"society_id": society_id}, request.args)
+        cursor = await get_tenant_db(society_id).complaints.aggregate(complaints_pipeline(match_query))
+        return list_response(await cursor.to_list())
+
+    except Exception as e:
+        record_database_error(e)
+        print(f"❌ Get complaints (async) error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error"}), 500
+
+@async_app.route("/get_polls", methods=["GET"])
+async def get_polls():
+    try:
+        society_id = get_society_id()
+        if not society_id: return jsonify({"error": "Invalid society ID"}), 400
+        db = get_tenant_db(society_id)
+        scope = {"society_id": society_id}
+
+        user_id_str = request.args.get("user_id")
+        user_obj_id = to_object_id(user_id_str) if user_id_str else None
+
+        async def vote_counts():
+            cursor = await db.poll_votes.aggregate(poll_vote_counts_pipeline(scope))
+            return await cursor.to_list()
+
+        async def user_votes():
+            if not user_obj_id:
+                return None
+            return await db.poll_votes.find({**scope, "user_id": user_obj_id}).to_list()
+
+        # The three queries are independent, so run them concurrently
+        polls, counts, votes = await asyncio.gather(
+            db.polls.find(scope).sort("created_at", -1).to_list(),
+            vote_counts(),
+            user_votes(),
+        )
+        return list_response(assemble_polls(polls, counts, votes))
+
+    except Exception as e:
+        record_database_error(e)
+        print(f"❌ Get polls (async) error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error"}), 500
+
+@async_app.route("/get_alerts", methods=["GET"])
+async def get_alerts():
+    try:
+        society_id = get_society_id()
+        if not society_id: return jsonify({"error": "Invalid society ID"}), 400
+
+        before, limit = alerts_page_args(request.args)
+        cursor = get_tenant_db(society_id).alerts.find(
+            alerts_filter({"society_id": society_id}, before), ALERT_PROJECTION).sort("created_at", -1).limit(limit)
+        return list_response([prepare_alert(a) for a in await cursor.to_list()])
+    except Exception as e:
+        record_database_error(e)
+        print(f"❌ Get alerts (async) error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+wsgi_application = WsgiToAsgi(flask_app)
+
+def served_async(scope):
+    if scope.get("path") not in ASYNC_ROUTES:
+        return False
+    return not wants_archived(dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))))
+
+async def application(scope, receive, send):
+    """ASGI entry point: async routes (and lifespan events) go to Quart, the rest to Flask."""
+    if scope["type"] == "lifespan" or served_async(scope):
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
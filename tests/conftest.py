@@ -0,0 +1,45 @@
+"""Imports app.py against an in-memory mongomock client instead of MongoDB Atlas."""
+import os
+import sys
+
+import mongomock
+import pytest
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+with mongomock.patch(servers=(("localhost", 27017),)):
+    import app as app_module
+
+
+@pytest.fixture
+def app():
+    return app_module
+
+
+@pytest.fixture
+def db(app):
+    """A clean default-society database for each test."""
+    database = app.get_tenant_db(app.DEFAULT_SOCIETY_ID)
+    for name in database.list_collection_names():
+        if name != "users":
+            database[name].delete_many({})
+    database.users.delete_many({"role": {"$ne": "admin"}})
+    return database
+
+
+@pytest.fixture(autouse=True)
+def sync_stamps(app, monkeypatch):
+    """mongomock has no pipeline updates ($$NOW), so sync stamps come from a plain $inc."""
+    def sync_stamp(database=None, society_id=None, count=1):
+        counter = (database if database is not None else app.get_tenant_db()).counters.find_one_and_update(
+            {"_id": f"sync_seq:{society_id or app.get_society_id()}"},
+            {"$inc": {"seq": count}, "$set": {"at": app.datetime.utcnow()}},
+            upsert=True, return_document=app.ReturnDocument.AFTER)
+        return {"sync_seq": counter["seq"], "sync_at": counter["at"]}
+    monkeypatch.setattr(app, "sync_stamp", sync_stamp)
+
+
+@pytest.fixture
+def client(app, db):
+    return app.app.test_client()
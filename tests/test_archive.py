@@ -0,0 +1,73 @@
+from bson.objectid import ObjectId
+
+
+def add_complaint(db, app, status="resolved", last_updated="2020-01-01T00:00:00"):
+    user_id = db.users.insert_one({"society_id": app.DEFAULT_SOCIETY_ID, "name": "Resident", "email": f"{ObjectId()}@example.com"}).inserted_id
+    complaint_id = db.complaints.insert_one({
+        "society_id": app.DEFAULT_SOCIETY_ID, "user_id": user_id, "title": "Leak",
+        "status": status, "created_at": last_updated, "last_updated": last_updated
+    }).inserted_id
+    db.complaint_likes.insert_one({"society_id": app.DEFAULT_SOCIETY_ID, "complaint_id": complaint_id, "user_id": ObjectId()})
+    return complaint_id
+
+
+def test_archives_old_resolved_complaints(app, db):
+    old = add_complaint(db, app)
+    recent = add_complaint(db, app, last_updated="2030-01-01T00:00:00")
+
+    assert app.archive_complaints(db, "2025-01-01T00:00:00") == 1
+
+    assert db.complaints.find_one({"_id": old}) is None
+    assert db.complaints.find_one({"_id": recent}) is not None
+    archived = db.complaints_archive.find_one({"_id": old})
+    assert archived["like_count"] == 1 and archived["user_name"] == "Resident"
+    assert db.complaint_likes.count_documents({"complaint_id": old}) == 0
+    assert db.tombstones.count_documents({"doc_id": str(old), "reason": "archived"}) == 1
+
+
+def test_complaint_reopened_during_archiving_stays_live(app, db, monkeypatch):
+    reopened = add_complaint(db, app)
+    archived = add_complaint(db, app)
+    insert_archive = app.insert_many_ignoring_duplicates
+
+    def reopen_then_insert(collection, docs):
+        # A resident reopens the complaint after the batch was read
+        db.complaints.update_one({"_id": reopened}, {"$set": {"status": "Open"}})
+        insert_archive(collection, docs)
+    monkeypatch.setattr(app, "insert_many_ignoring_duplicates", reopen_then_insert)
+
+    assert app.archive_complaints(db, "2025-01-01T00:00:00") == 1
+
+    assert db.complaints.find_one({"_id": reopened})["status"] == "Open"
+    assert db.complaint_likes.count_documents({"complaint_id": reopened}) == 1
+    assert db.complaints_archive.find_one({"_id": reopened}) is None
+    assert db.tombstones.count_documents({"doc_id": str(reopened)}) == 0
+
+    assert db.complaints.find_one({"_id": archived}) is None
+    assert db.complaints_archive.find_one({"_id": archived}) is not None
+    assert db.tombstones.count_documents({"doc_id": str(archived)}) == 1
+
+
+def test_archived_rows_have_the_same_keys_as_live_rows(app, db):
+    add_complaint(db, app)
+    voter = ObjectId()
+    poll_id = db.polls.insert_one({
+        "society_id": app.DEFAULT_SOCIETY_ID, "user_id": ObjectId(), "question": "Paint the gate?",
+        "options": ["Yes", "No"], "is_active": False, "created_at": "2020-01-01T00:00:00",
+        "closed_at": "2020-01-02T00:00:00", **app.sync_stamp(db, app.DEFAULT_SOCIETY_ID)
+    }).inserted_id
+    db.poll_votes.insert_one({"society_id": app.DEFAULT_SOCIETY_ID, "poll_id": poll_id, "user_id": voter, "option_index": 1})
+    db.complaints.update_many({}, {"$set": app.sync_stamp(db, app.DEFAULT_SOCIETY_ID)})
+    app.archive_complaints(db, "2025-01-01T00:00:00")
+    app.archive_polls(db, "2025-01-01T00:00:00")
+    scope = {"society_id": app.DEFAULT_SOCIETY_ID}
+
+    [complaint] = app.archived_complaints_query(db, scope)()
+    [poll] = app.archived_polls_query(db, scope, voter)()
+    [other_users_view] = app.archived_polls_query(db, scope, ObjectId())()
+
+    for row in (complaint, poll):
+        assert not {"sync_seq", "sync_at", "society_id", "archived_at", "votes"} & row.keys()
+    assert poll["question"] == "Paint the gate?" and poll["total_votes"] == 1
+    assert poll["user_voted_index"] == 1
+    assert other_users_view["user_voted_index"] == -1
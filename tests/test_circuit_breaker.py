@@ -0,0 +1,58 @@
+import pytest
+
+
+@pytest.fixture
+def clock(app, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(app):
+    breaker = app.CircuitBreaker(failure_threshold=2, reset_seconds=30, probe_timeout=15)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_opens_after_threshold_and_rejects_until_reset(app, clock):
+    breaker = open_breaker(app)
+    assert not breaker.allow()
+    clock[0] += 29
+    assert not breaker.allow()
+    assert breaker.retry_after() == 1
+
+
+def test_probe_success_closes(app, clock):
+    breaker = open_breaker(app)
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    assert not breaker.allow() # Only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens(app, clock):
+    breaker = open_breaker(app)
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_probe_without_outcome_lets_another_probe_through(app, clock):
+    # e.g. the probe was a 404 or a 400 that never reached MongoDB
+    breaker = open_breaker(app)
+    clock[0] += 30
+    assert breaker.allow()
+    assert [breaker.allow() for _ in range(3)] == [False, False, False]
+    clock[0] += 15
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
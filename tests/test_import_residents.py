@@ -0,0 +1,86 @@
+import io
+
+HEADER = "name,email,password,house_number\n"
+
+
+def upload(client, body, role="admin"):
+    data = {"user_role": role, "file": (io.BytesIO(body if isinstance(body, bytes) else body.encode()), "residents.csv")}
+    return client.post("/admin/import_residents", data=data, content_type="multipart/form-data")
+
+
+def test_requires_admin(client):
+    assert upload(client, HEADER, role="resident").status_code == 403
+
+
+def test_imports_rows_and_reports_per_row_errors(client, db):
+    db.users.insert_one({"name": "Existing", "email": "taken@example.com", "role": "resident"})
+    db.registration_requests.insert_one({"name": "Pending", "email": "pending@example.com"})
+    body = HEADER + "".join([
+        "Asha,asha@example.com,pw,A-1\n",        # row 2: imported
+        "Ravi,ravi@example.com,pw,A-2\n",        # row 3: imported
+        "Asha Again,asha@example.com,pw,A-3\n",  # row 4: duplicate within the file
+        "Old,taken@example.com,pw,A-4\n",        # row 5: already a user
+        "Waiting,pending@example.com,pw,A-5\n",  # row 6: pending registration
+        "NoHouse,nohouse@example.com,pw,\n",     # row 7: missing field
+        "Bad,not-an-email,pw,A-7\n",             # row 8: invalid email
+    ])
+
+    response = upload(client, body)
+
+    assert response.status_code == 200
+    assert response.get_json()["inserted"] == 2
+    assert [(e["row"], e["error"]) for e in response.get_json()["errors"]] == [
+        (4, "Duplicate email in file"),
+        (5, "Email already exists as a user or a pending request"),
+        (6, "Email already exists as a user or a pending request"),
+        (7, "Missing required fields"),
+        (8, "Invalid email"),
+    ]
+    assert db.users.count_documents({"email": {"$in": ["asha@example.com", "ravi@example.com"]}}) == 2
+
+
+def test_dedup_across_batches(app, db):
+    body = HEADER + "".join(f"R{i},r{i % 3}@example.com,pw,B-{i}\n" for i in range(6))
+
+    with app.app.test_request_context():
+        inserted, errors, stopped = app.import_residents_csv(io.StringIO(body), batch_size=2)
+
+    assert (inserted, stopped) == (3, None)
+    assert [(e["row"], e["error"]) for e in errors] == [(5, "Duplicate email in file"), (6, "Duplicate email in file"),
+                                                        (7, "Duplicate email in file")]
+    assert db.users.count_documents({"email": {"$regex": "^r[0-2]@example.com$"}}) == 3
+
+
+def test_missing_columns(client):
+    response = upload(client, "name,email\nAsha,asha@example.com\n")
+    assert response.status_code == 200
+    assert response.get_json()["inserted"] == 0
+    assert response.get_json()["errors"][0]["row"] == 1
+
+
+def test_non_utf8_file_stops_with_400_and_keeps_earlier_rows(client, db):
+    # Enough valid rows that they are decoded and imported before the bad byte is reached
+    good = "".join(f"Resident {i},u{i}@example.com,pw,C-{i}\n" for i in range(400))
+    body = (HEADER + good).encode() + "Zoë,zoe@example.com,pw,C-999\n".encode("latin-1")
+
+    response = upload(client, body)
+
+    assert response.status_code == 400
+    payload = response.get_json()
+    assert "UTF-8" in payload["error"]
+    assert payload["inserted"] > 0
+    assert payload["inserted"] == db.users.count_documents({"email": {"$regex": "^u[0-9]+@example.com$"}})
+    assert payload["errors"][-1]["error"] == payload["error"]
+
+
+def test_malformed_csv_stops_with_400(app, client):
+    default_limit = app.csv.field_size_limit(100)
+    try:
+        body = HEADER + "Asha,asha@example.com,pw,A-1\n" + "Long," + "x" * 200 + "@example.com,pw,A-2\n"
+        response = upload(client, body)
+    finally:
+        app.csv.field_size_limit(default_limit)
+
+    assert response.status_code == 400
+    assert response.get_json()["inserted"] == 1
+    assert "Malformed CSV" in response.get_json()["error"]
@@ -0,0 +1,19 @@
+from pymongo import monitoring
+
+
+def test_waits_come_from_event_durations(app):
+    stats = app.PoolStats()
+    address = ("localhost", 27017)
+    # Overlapping checkouts (as with the async client, all on one thread)
+    stats.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+    stats.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+    stats.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 1, 0.2))
+    stats.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 2, 0.05))
+    stats.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(address, "timeout", 1.0))
+
+    snapshot = stats.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checked_out"] == 2
+    assert snapshot["checkout_failures"] == 1
+    assert snapshot["wait_ms_max"] == 1000.0
+    assert snapshot["wait_ms_avg"] == round((200 + 50 + 1000) / 3, 2)
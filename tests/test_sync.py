@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+
+def token_for(app, seq, at):
+    return f"{seq}-{int((at - app.EPOCH).total_seconds() * 1000)}"
+
+
+def test_rejects_malformed_token(client):
+    assert client.get("/sync?since=abc").status_code == 400
+
+
+def test_first_sync_is_a_full_snapshot(client):
+    response = client.get("/sync")
+    assert response.status_code == 200
+    assert response.get_json()["full"] is True
+
+
+def test_recent_token_gets_a_delta_with_deletions(app, client, db):
+    stamp = app.sync_stamp(db, app.DEFAULT_SOCIETY_ID)
+    since = token_for(app, stamp["sync_seq"], stamp["sync_at"])
+    app.record_tombstones(db, "alert", [{"_id": "a1", "society_id": app.DEFAULT_SOCIETY_ID}])
+
+    payload = client.get(f"/sync?since={since}").get_json()
+
+    assert payload["full"] is False
+    assert {"kind": "alert", "doc_id": "a1", "reason": "deleted"} in payload["deleted"]
+
+
+def test_token_older_than_tombstone_retention_gets_a_full_snapshot(app, client):
+    old = datetime.utcnow() - timedelta(days=app.TOMBSTONE_RETENTION_DAYS, minutes=1)
+
+    payload = client.get(f"/sync?since={token_for(app, 5, old)}").get_json()
+
+    assert payload["full"] is True
+    assert payload["deleted"] == []